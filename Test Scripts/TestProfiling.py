@@ -0,0 +1,17 @@
+import numpy as np
+
+from utils import profiling
+
+# a parent's allocations before its first child must survive the child's peak reset
+profiling.enable(trace_allocations=True)
+with profiling.span("parent"):
+    a = np.ones(10 ** 7)
+    del a
+    with profiling.span("child"):
+        b = np.ones(10)
+spans = {s["name"]: s for s in profiling.trace()["spans"]}
+profiling.disable()
+
+print({name: s["alloc_peak_b"] for name, s in spans.items()})
+assert spans["parent"]["alloc_peak_b"] >= 8 * 10 ** 7, "parent peak lost"
+assert spans["child"]["alloc_peak_b"] < 10 ** 6, "child peak includes the parent's allocations"
@@ -0,0 +1,78 @@
+"""
+Startup-time benchmark.
+
+Every scenario runs in a fresh interpreter (median of --repeat runs, wall
+clock including interpreter start) and has to stay inside its budget:
+
+    config lookup    import config + preset registry       0.25 s
+    population       import simulation.population          0.50 s
+    headless cli     import cli (no simulation yet)        0.50 s
+
+On top of the timing, the listed heavy modules must not be imported at all
+by that scenario; they only load when a feature needs them.
+
+    python -m benchmarks.startup [--repeat 5]
+
+Exits non-zero when a budget is exceeded or a heavy module leaks in.
+"""
+import argparse
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+HEAVY = ("matplotlib", "pandas", "tkinter", "ttkbootstrap", "PyPDF2")
+
+# name -> (code, budget in seconds, modules that must stay unloaded)
+SCENARIOS = {
+    "config lookup": (
+        "import config as cfg, utils.util_functions as u; u.gather_config_names(cfg)",
+        0.25, HEAVY + ("numpy",),
+    ),
+    "population": ("import simulation.population", 0.50, HEAVY),
+    "headless cli": ("import cli", 0.50, HEAVY),
+}
+
+
+def _time_once(code: str, forbidden) -> tuple[float, list[str]]:
+    check = f"; import sys; print(','.join(m for m in {tuple(forbidden)!r} if m in sys.modules))"
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code + check], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    return time.perf_counter() - start, [m for m in out.strip().split(",") if m]
+
+
+def run(repeat: int = 5) -> dict:
+    results = {}
+    for name, (code, budget, forbidden) in SCENARIOS.items():
+        timings, leaked = [], []
+        for _ in range(repeat):
+            elapsed, leaked = _time_once(code, forbidden)
+            timings.append(elapsed)
+        results[name] = {
+            "median_s": statistics.median(timings),
+            "budget_s": budget,
+            "leaked": leaked,
+            "ok": statistics.median(timings) <= budget and not leaked,
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    for name, r in results.items():
+        status = "ok" if r["ok"] else "FAIL"
+        leaked = f"  leaked: {', '.join(r['leaked'])}" if r["leaked"] else ""
+        print(f"{name:<14} {r['median_s']:.3f}s / {r['budget_s']:.2f}s  {status}{leaked}")
+    sys.exit(0 if all(r["ok"] for r in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
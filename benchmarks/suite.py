@@ -0,0 +1,225 @@
+"""
+Runtime / memory benchmark suite with stored baselines.
+
+Every case runs in its own interpreter, so peak RSS is not inflated by the
+cases before it. Per case the suite records
+
+    median_s         median wall time of --repeat timed runs
+    tracemalloc_b    peak traced allocation of one extra (untimed) run
+    max_rss_b        peak RSS of the case's interpreter, setup included
+
+Cases: Population.simulate from the small preset up to 10^7 cubes (plus the
+streaming path), every plot_* method, Agg rendering of the report figure and
+in-memory PDF export / append.
+
+    python -m benchmarks.suite                      # run and print
+    python -m benchmarks.suite --save               # ... and store as baseline
+    python -m benchmarks.suite --check [--tolerance 0.2]
+
+--check exits non-zero when a case is slower or uses more memory than the
+baseline (benchmarks/baseline.json by default) by more than the tolerance;
+time differences under 5 ms are ignored.
+The committed benchmarks/baseline.json is a reference run (its "_machine"
+block says where). Baselines are machine specific: on other hardware, run
+--save once before relying on --check (a machine mismatch is reported).
+"""
+import argparse
+import json
+import os
+import pathlib
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+BASELINE = ROOT / "benchmarks" / "baseline.json"
+
+# timing differences below this are noise, whatever the relative change
+MIN_DELTA_S = 0.005
+
+# ru_maxrss is in kilobytes on Linux, bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+SIMULATE_SIZES = {"small": 100, "default": 1_000, "medium": 10_000, "large": 1_000_000, "10M": 10_000_000}
+
+
+def _population(size: float, **kwargs):
+    import config as cfg
+    from simulation.population import Population
+    return Population(cfg.cube.default, cfg.population.PopulationConfig(size), cfg.scale.cube_scale,
+                      seed=0, **kwargs)
+
+
+def _simulated(size: float = 1_000_000):
+    pop = _population(size)
+    pop.simulate()
+    return pop
+
+
+def _simulate(size: float):
+    def setup():
+        pop = _population(size)
+        return pop.simulate
+    return setup
+
+
+def _simulate_stream(size: float):
+    def setup():
+        pop = _population(size)
+        return pop.simulate_stream
+    return setup
+
+
+def _plot(method: str):
+    def setup():
+        from matplotlib.figure import Figure
+        pop = _simulated()
+
+        def run():
+            # drop the cached bins so binning is part of the measurement
+            pop._hist_cache.clear()
+            getattr(pop, method)(ax=Figure().subplots())
+        return run
+    return setup
+
+
+def _render():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from simulation.report import build_figure
+    pop = _simulated()
+
+    def run():
+        pop._hist_cache.clear()
+        FigureCanvasAgg(build_figure(pop)).draw()
+    return run
+
+
+def _pdf(append: bool):
+    def setup():
+        from simulation.report import build_figure
+        from utils.pdf_export import export_figures
+        fig = build_figure(_simulated())
+        target = os.path.join(tempfile.mkdtemp(), "report.pdf")
+        export_figures(target, [fig] * 10, append=False)
+
+        def run():
+            export_figures(target, [fig], titles=["benchmark"], append=append)
+        return run
+    return setup
+
+
+# name -> setup() returning the callable that is measured
+CASES = {
+    **{f"simulate {name}": _simulate(size) for name, size in SIMULATE_SIZES.items()},
+    "simulate_stream 10M": _simulate_stream(10_000_000),
+    "plot_true_weights": _plot("plot_true_weights"),
+    "plot_measured_weights": _plot("plot_measured_weights"),
+    "plot_errors": _plot("plot_errors"),
+    "render agg": _render,
+    "pdf export": _pdf(append=False),
+    "pdf append": _pdf(append=True),
+}
+
+
+def _run_case(name: str, repeat: int) -> dict:
+    """Executed in the child interpreter."""
+    import matplotlib
+    matplotlib.use("Agg")
+    run = CASES[name]()
+    run()  # warm-up: imports, first-touch allocations
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "tracemalloc_b": peak,
+        "max_rss_b": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT,
+    }
+
+
+def run(names=None, repeat: int = 3) -> dict:
+    results = {}
+    for name in names or CASES:
+        out = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--case", name, "--repeat", str(repeat)],
+                             cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        results[name] = json.loads(out.strip().splitlines()[-1])
+    return results
+
+
+def check(results: dict, baseline: dict, tolerance: float, mem_tolerance: float) -> list[str]:
+    """Regressions of results against baseline, as printable lines."""
+    failures = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limits = (("median_s", tolerance), ("tracemalloc_b", mem_tolerance), ("max_rss_b", mem_tolerance))
+        for metric, tol in limits:
+            floor = MIN_DELTA_S if metric == "median_s" else 0
+            if r[metric] > base[metric] * (1 + tol) and r[metric] - base[metric] > floor:
+                failures.append(f"{name}: {metric} {r[metric]:.4g} > {base[metric]:.4g} (+{tol:.0%})")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", action="append", metavar="CASE", help="Run only these cases (repeatable)")
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Fail on regressions against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Allowed relative slowdown")
+    parser.add_argument("--mem-tolerance", type=float, default=0.10, help="Allowed relative memory growth")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(_run_case(args.case, args.repeat)))
+        return
+
+    unknown = set(args.only or ()) - set(CASES)
+    if unknown:
+        parser.error(f"Unknown case(s) {sorted(unknown)}, choose from {list(CASES)}")
+
+    results = run(args.only, args.repeat)
+    for name, r in results.items():
+        print(f"{name:<22} {r['median_s']:9.4f}s  traced {r['tracemalloc_b'] / 2**20:8.1f} MiB"
+              f"  rss {r['max_rss_b'] / 2**20:8.1f} MiB")
+
+    if args.save:
+        stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        stored.update({"_machine": {"python": platform.python_version(), "platform": platform.platform()}})
+        stored.update(results)
+        args.baseline.write_text(json.dumps(stored, indent=2))
+        print(f"Baseline written to {args.baseline}")
+
+    if args.check:
+        if not args.baseline.exists():
+            parser.error(f"No baseline at {args.baseline}, run with --save first")
+        baseline = json.loads(args.baseline.read_text())
+        machine = {"python": platform.python_version(), "platform": platform.platform()}
+        if baseline.get("_machine", machine) != machine:
+            print(f"Warning: baseline was recorded on {baseline['_machine']}, not {machine}; "
+                  f"run with --save to compare against this machine")
+        failures = check(results, baseline, args.tolerance, args.mem_tolerance)
+        for line in failures:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
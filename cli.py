@@ -0,0 +1,176 @@
+"""
+Headless batch runs: simulate one or many config combinations and write the
+report figures and summary metrics straight to disk. Never imports the GUI.
+
+    python cli.py --cube heavy --population large --scale cube_scale --scale aec_scale \
+                  --seed 42 --out figures/batch --format pdf json
+
+Configs are preset names from the config package, a preset with overrides
+(heavy:part_tolerance=2.5) or only overrides applied to the default preset
+(base_weight=1000,part_tolerance=1).
+
+--calibrate fits the cube and scale configs to a weighing log (CSV with
+unit_id / reading columns, or binary records, see simulation.calibrate) and
+runs them as the "calibrated" cube and scale.
+
+--trace writes a JSON trace of timing spans (draws, binning, plotting, PDF
+rendering / merging) for the whole batch, with one "run" span per combination.
+"""
+import argparse
+import json
+import pathlib
+import typing
+from dataclasses import fields, replace
+from itertools import product
+
+import config as cfg
+import utils.util_functions as utils
+from utils import profiling
+from simulation.population import Population
+from simulation.quantize import ROUNDING_MODES
+from simulation.report import build_figure, summary_metrics
+from simulation.sampling import SAMPLERS
+
+
+# default preset per config module, for specs that only give overrides
+_DEFAULT_PRESET = {"cube": "default", "population": "default", "scale": "cube_scale"}
+
+
+def resolve_config(module: str, spec: str):
+    """Preset name, 'preset:field=value,...' or 'field=value,...' -> config dataclass."""
+    presets = utils.gather_configs(cfg)[module]
+    name, _, overrides = spec.partition(":")
+    if "=" in name:
+        name, overrides = _DEFAULT_PRESET[module], spec
+    if name not in presets:
+        raise argparse.ArgumentTypeError(f"Unknown {module} preset {name!r}, choose one of {list(presets)}")
+    preset = presets[name]
+    if not overrides:
+        return name, preset
+
+    # field annotations, so that population_size=1e5 is read as the declared float
+    hints = typing.get_type_hints(type(preset))
+    types = {f.name: hints[f.name] for f in fields(preset)}
+    values = {}
+    for item in overrides.split(","):
+        key, _, value = item.partition("=")
+        if key not in types:
+            raise argparse.ArgumentTypeError(f"{module} config has no field {key!r}, choose one of {list(types)}")
+        try:
+            values[key] = types[key](value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"Invalid value {value!r} for {module} field {key!r} ({types[key].__name__})") from None
+    return spec, replace(preset, **values)
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Headless scale error simulation runs")
+    parser.add_argument("--cube", action="append", help="cube preset / overrides (repeatable)")
+    parser.add_argument("--population", action="append", help="population preset / overrides (repeatable)")
+    parser.add_argument("--scale", action="append", help="scale preset / overrides (repeatable)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--rounding", choices=list(ROUNDING_MODES), default=None,
+                        help="quantize readings to the scale resolution")
+    parser.add_argument("--sampler", choices=list(SAMPLERS), default="pseudo")
+    parser.add_argument("--stream", action="store_true",
+                        help="constant-memory streaming simulation")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="simulate streaming across a process pool")
+    parser.add_argument("--cache", nargs="?", const=".cache/populations", default=None, metavar="DIR",
+                        help="reuse seeded results from a disk cache (default dir: .cache/populations)")
+    parser.add_argument("--calibrate", metavar="LOG", default=None,
+                        help="fit cube tolerance and scale error to a weighing log (.csv or binary) "
+                             "instead of --cube / --scale")
+    parser.add_argument("--out", default="figures/batch", help="output directory")
+    parser.add_argument("--format", nargs="+", choices=["pdf", "png", "json"], default=["pdf", "json"])
+    parser.add_argument("--append", metavar="PDF", default=None,
+                        help="append the pages to this (existing) report instead of writing report.pdf")
+    parser.add_argument("--export", choices=["npy", "parquet", "arrow"], default=None,
+                        help="also save every simulated population as columnar data (<out>/<run>/); "
+                             "not available with --workers")
+    parser.add_argument("--trace", nargs="?", const="trace.json", default=None, metavar="FILE",
+                        help="write a JSON profiling trace (default: trace.json in the output directory)")
+    parser.add_argument("--trace-alloc", action="store_true",
+                        help="also record peak allocations per span (slower)")
+    return parser
+
+
+def run(args) -> list[dict]:
+    if args.export and args.workers:
+        raise argparse.ArgumentTypeError("--export is not available with --workers")
+    if args.calibrate and (args.cube or args.scale):
+        raise argparse.ArgumentTypeError("--calibrate replaces --cube / --scale")
+    out = pathlib.Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    if args.calibrate:
+        from simulation.calibrate import calibrate
+        fit = calibrate(args.calibrate)
+        cubes, scales = [("calibrated", fit["cube"])], [("calibrated", fit["scale"])]
+        print(f"calibrated: part_tolerance={fit['cube'].part_tolerance:.6g} "
+              f"scale_error={fit['scale'].scale_error:.6g} ({fit['units']} units, {fit['readings']} readings)")
+    else:
+        cubes = [resolve_config("cube", s) for s in args.cube or ["heavy"]]
+        scales = [resolve_config("scale", s) for s in args.scale or ["cube_scale"]]
+    combos = product(cubes, [resolve_config("population", s) for s in args.population or ["large"]], scales)
+
+    cache = None
+    if args.cache:
+        from simulation.cache import ResultCache
+        cache = ResultCache(args.cache)
+
+    if args.trace:
+        profiling.enable(trace_allocations=args.trace_alloc)
+
+    figures, metrics = [], []
+    for (cube_name, cube_cfg), (pop_name, pop_cfg), (scale_name, scale_cfg) in combos:
+        name = f"{cube_name}_{pop_name}_{scale_name}"
+        with profiling.span("run", name=name):
+            pop = Population(cube_cfg, pop_cfg, scale_cfg, seed=args.seed,
+                             rounding=args.rounding, sampler=args.sampler, cache=cache)
+            if args.workers:
+                pop.simulate_parallel(workers=args.workers)
+            elif args.stream and args.export:
+                # chunks go straight into the export, nothing is kept in memory
+                pop.export(out / utils.safe_filename(name), args.export)
+            elif args.stream:
+                pop.simulate_stream()
+            else:
+                pop.simulate()
+
+            fig = build_figure(pop)
+            if "png" in args.format:
+                with profiling.span("png", name=name):
+                    fig.suptitle(name, fontsize=14, fontweight='bold')
+                    fig.savefig(out / f"{utils.safe_filename(name)}.png")
+                    fig.suptitle("")
+            if args.export and not args.stream and pop.result is not None:
+                pop.export(out / utils.safe_filename(name), args.export)
+            figures.append((name, fig))
+            metrics.append({"name": name, "seed": args.seed, **summary_metrics(pop)})
+        print(f"{name}: done")
+
+    if "pdf" in args.format:
+        from utils.pdf_export import export_figures
+        # one in-memory render and a single write for all pages
+        names, figs = zip(*figures) if figures else ((), ())
+        target = args.append or str(out / "report.pdf")
+        export_figures(target, list(figs), titles=list(names), append=args.append is not None)
+    if "json" in args.format:
+        (out / "summary.json").write_text(json.dumps(metrics, indent=2))
+    if args.trace:
+        profiling.dump(str(out / args.trace), runs=[m["name"] for m in metrics], seed=args.seed)
+        profiling.disable()
+    return metrics
+
+
+def main(argv=None):
+    parser = _parser()
+    try:
+        run(parser.parse_args(argv))
+    except argparse.ArgumentTypeError as exc:
+        parser.error(str(exc))
+
+
+if __name__ == '__main__':
+    main()
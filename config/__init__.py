@@ -1,5 +1,6 @@
+from . import assembly
 from . import cube
 from . import population
 from . import scale
 
-__all__ = ["cube", "population", "scale"]
+__all__ = ["assembly", "cube", "population", "scale"]
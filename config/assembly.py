@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+
+@dataclass(frozen=True)
+class AssemblyConfig:
+    part_weights:     tuple[float, ...]
+    part_tolerances:  tuple[float, ...]
+    weight_unit:      str
+    # every unit is weighed `repeats` times, the reported weight is the mean
+    repeats:          int = 1
+    # scale drift per weighing: linear rate + sine (amplitude, period in weighings)
+    # + random walk with step std drift_walk
+    drift_rate:       float = 0.0
+    drift_amplitude:  float = 0.0
+    drift_period:     float = 0.0
+    drift_walk:       float = 0.0
+
+
+# presets
+default = AssemblyConfig(
+    part_weights=(1200.0, 800.0, 350.0, 100.0, 50.0),
+    part_tolerances=(3.0, 2.5, 1.5, 0.5, 0.5),
+    weight_unit="g",
+    repeats=3,
+    drift_rate=1e-6,
+)
+
+gearbox = AssemblyConfig(
+    part_weights=(9000.0, 6500.0, 3200.0, 2400.0, 1100.0, 900.0, 600.0, 450.0, 300.0, 250.0, 200.0, 100.0),
+    part_tolerances=(4.0, 3.5, 2.0, 2.0, 1.0, 1.0, 0.8, 0.5, 0.5, 0.4, 0.3, 0.2),
+    weight_unit="g",
+    repeats=5,
+    drift_amplitude=2.0,
+    drift_period=500_000,
+    drift_walk=0.0005,
+)
@@ -0,0 +1,130 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+from simulation.analytic import tolerance_band
+from simulation.stats import FixedHistogram
+
+
+class _PowerSums:
+    """Sums of (x - shift)^k, k = 1..4, for the mean / std standard errors."""
+    def __init__(self) -> None:
+        self.shift = None
+        self.n = 0
+        self.s = np.zeros(4)
+
+    def update(self, x: np.ndarray) -> None:
+        if self.shift is None:
+            self.shift = float(x.mean())
+        d = x - self.shift
+        d2 = d * d
+        self.s += (d.sum(), d2.sum(), (d2 * d).sum(), (d2 * d2).sum())
+        self.n += x.size
+
+    def central(self) -> tuple[float, float, float]:
+        """mean, variance, fourth central moment"""
+        m1, m2, m3, m4 = self.s / self.n
+        var = m2 - m1 * m1
+        mu4 = m4 - 4 * m1 * m3 + 6 * m1 * m1 * m2 - 3 * m1 ** 4
+        return self.shift + m1, var, mu4
+
+
+def _wilson(k: int, n: int, z: float) -> tuple[float, float]:
+    """Wilson score interval, stays sensible for rates near 0."""
+    p = k / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(center - half, 0.0), min(center + half, 1.0)
+
+
+def _quantile_from_hist(hist: FixedHistogram, n: int, rank: float) -> float:
+    """Value below which `rank` of the n samples fall, interpolated inside the bin."""
+    cum = hist.underflow + np.cumsum(hist.counts)
+    rank = min(max(rank, 0.0), n - 1.0)
+    i = int(np.searchsorted(cum, rank, side="right"))
+    if i >= hist.counts.size:
+        return float(hist.edges[-1])
+    before = cum[i] - hist.counts[i]
+    frac = (rank - before) / hist.counts[i] if hist.counts[i] else 0.0
+    return float(hist.edges[i] + frac * (hist.edges[i + 1] - hist.edges[i]))
+
+
+def simulate_until(
+        pop,
+        targets: dict[str, float],
+        batch_size: int = 10_000,
+        max_samples: int = 100_000_000,
+        confidence: float = 0.95,
+        band: tuple[float, float] | None = None,
+        bins: int = 200,
+) -> dict:
+    """
+    --- Draw batches until every confidence interval is narrow enough ---
+
+            targets maps a metric to the largest acceptable CI half-width:
+              "mean_err", "std_err"   mean / std of measurement_err
+              "q0.99", "q0.001", ...  quantile of measurement_err
+              "misclassification"     rate of readings on the other side of
+                                      band than the true weight
+            After each batch the next batch size is extrapolated from how far
+            the widest interval still is from its target (at most doubling the
+            sample), until all targets are met or max_samples is reached.
+            pop ends up with streaming stats / histograms as after simulate_stream().
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    band = band or tolerance_band(pop.cube)
+    sigma = pop._sigmas()["measurement_err"]
+    err_hist = FixedHistogram.around(0.0, sigma, bins=20 * bins, k=8.0)
+    sums = _PowerSums()
+    stats, hists = pop._new_stream_state(bins)
+    misclassified = 0
+
+    n, batch = 0, batch_size
+    while True:
+        true_weight, measured = pop._draw(batch)
+        pop._update_stream(stats, hists, true_weight, measured)
+        err = measured - true_weight
+        sums.update(err)
+        err_hist.update(err)
+        true_in = (true_weight >= band[0]) & (true_weight <= band[1])
+        measured_in = (measured >= band[0]) & (measured <= band[1])
+        misclassified += int(np.count_nonzero(true_in != measured_in))
+        n += batch
+
+        mean, var, mu4 = sums.central()
+        report = {}
+        for metric, target in targets.items():
+            if metric == "mean_err":
+                estimate, half = mean, z * math.sqrt(var / n)
+                ci = (estimate - half, estimate + half)
+            elif metric == "std_err":
+                # delta method: se(s) = se(s^2) / 2s, se(s^2) = sqrt((mu4 - s^4) / n)
+                estimate = math.sqrt(var)
+                half = z * math.sqrt(max(mu4 - var * var, 0.0) / n) / (2 * estimate)
+                ci = (estimate - half, estimate + half)
+            elif metric == "misclassification":
+                estimate = misclassified / n
+                ci = _wilson(misclassified, n, z)
+            elif metric.startswith("q"):
+                p = float(metric[1:])
+                spread = z * math.sqrt(n * p * (1 - p))
+                estimate = _quantile_from_hist(err_hist, n, n * p)
+                ci = (_quantile_from_hist(err_hist, n, n * p - spread),
+                      _quantile_from_hist(err_hist, n, n * p + spread))
+            else:
+                raise ValueError(f"Unknown metric {metric!r}")
+            half = 0.5 * (ci[1] - ci[0])
+            report[metric] = {"estimate": estimate, "ci": ci, "half_width": half, "target": target}
+
+        # half-widths shrink like 1/sqrt(n)
+        needed = max((r["half_width"] / r["target"]) ** 2 for r in report.values())
+        converged = needed <= 1.0
+        if converged or n >= max_samples:
+            break
+        batch = int(min(max(batch_size, n * needed - n), n, max_samples - n))
+
+    pop._clear_results()
+    pop.stats, pop.hists = stats, hists
+    return {"samples": n, "converged": converged, "confidence": confidence, "metrics": report}
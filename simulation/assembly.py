@@ -0,0 +1,161 @@
+import math
+
+import numpy as np
+
+import config as cfg
+from simulation.population import Population
+from simulation.quantize import quantize
+from utils.profiling import span
+
+
+# elements per temporary (N x parts / N x repeats) array: 32 MB of float64
+BLOCK_ELEMENTS = 4_000_000
+
+
+def equivalent_cube(assembly: cfg.assembly.AssemblyConfig) -> cfg.cube.CubeConfig:
+    """Single-weight CubeConfig with the assembly's total weight and combined tolerance."""
+    return cfg.cube.CubeConfig(
+        base_weight=float(sum(assembly.part_weights)),
+        base_weight_unit=assembly.weight_unit,
+        part_tolerance=float(math.hypot(*assembly.part_tolerances)),
+        tolerance_unit=assembly.weight_unit,
+    )
+
+
+class AssemblyPopulation(Population):
+    """
+    --- Population of multi-part assemblies weighed repeatedly on a drifting scale ---
+
+            The true weight of a unit is the sum of its parts, each drawn with its
+            own tolerance. Every unit is weighed `repeats` times; each reading gets
+            its own scale error, the scale drift at that weighing (weighings are
+            numbered across the whole run) and the scale rounding, and `measured`
+            is the mean of the readings.
+
+            Everything is drawn as (units x parts) and (units x repeats) arrays in
+            blocks of at most BLOCK_ELEMENTS, so memory stays bounded whatever the
+            product of population size, parts and repeats; simulate_stream() keeps
+            the total bounded as well. The drift state (weighing counter and
+            random-walk level) carries over from block to block and chunk to chunk.
+
+            self.cube is the equivalent single-weight cube, so reports, histograms
+            and summaries work unchanged.
+    """
+    def __init__(
+            self,
+            assembly_cfg: cfg.assembly,
+            pop_cfg: cfg.population,
+            scale_cfg: cfg.scale,
+            sampler="pseudo",
+            **kwargs,
+    ) -> None:
+        if sampler != "pseudo":
+            raise ValueError("AssemblyPopulation only supports the pseudo-random sampler")
+        if len(assembly_cfg.part_weights) != len(assembly_cfg.part_tolerances):
+            raise ValueError("part_weights and part_tolerances need one entry per part")
+        if assembly_cfg.repeats < 1:
+            raise ValueError("repeats must be at least 1")
+        if assembly_cfg.drift_amplitude and assembly_cfg.drift_period <= 0:
+            raise ValueError("a sine drift needs a positive drift_period")
+        if kwargs.get("store_counts") and assembly_cfg.repeats > 1:
+            raise ValueError("store_counts needs readings on the resolution grid (repeats=1)")
+        super().__init__(equivalent_cube(assembly_cfg), pop_cfg, scale_cfg, **kwargs)
+        self.assembly = assembly_cfg
+        self._tolerances = np.asarray(assembly_cfg.part_tolerances, dtype=self.dtype)
+        # index of the next weighing and current random-walk drift level
+        self._weighings = 0
+        self._walk = 0.0
+
+
+    def _spawn(self, seed: np.random.SeedSequence, n: int, start: int = 0) -> "AssemblyPopulation":
+        if self.assembly.drift_walk:
+            raise ValueError("Random-walk drift depends on every earlier weighing; "
+                             "use simulate_stream() instead of parallel blocks")
+        block = type(self)(
+            self.assembly, cfg.population.PopulationConfig(population_size=n), self.scale,
+            seed=seed, dtype=self.dtype, rounding=self.rounding,
+        )
+        block._weighings = start * self.assembly.repeats
+        return block
+
+
+    def _cache_params(self) -> dict:
+        from dataclasses import asdict
+        return {**super()._cache_params(), "assembly": asdict(self.assembly)}
+
+    def _reseed_after_cached_run(self) -> None:
+        super()._reseed_after_cached_run()
+        # a cache hit cannot restore the random-walk level, the walk restarts at 0 then
+        self._weighings = int(self.n) * self.assembly.repeats
+
+
+    def _sigmas(self) -> dict[str, float]:
+        sigmas = super()._sigmas()
+        a = self.assembly
+        total = self.n * a.repeats
+        # rms of the drift over the whole run, to keep it inside the histogram edges
+        drift = math.sqrt((a.drift_rate * total) ** 2 / 3 + a.drift_amplitude ** 2 / 2
+                          + a.drift_walk ** 2 * total / 2)
+        err = math.hypot(self.scale.scale_error / math.sqrt(a.repeats), drift)
+        sigmas["measurement_err"] = err
+        sigmas["measured"] = math.hypot(sigmas["true_weight"], err)
+        return sigmas
+
+
+    def _drift(self, k: int) -> np.ndarray | float:
+        """Drift of the next k weighings, advancing the drift state."""
+        a = self.assembly
+        start, self._weighings = self._weighings, self._weighings + k
+        if not (a.drift_rate or a.drift_amplitude or a.drift_walk):
+            return 0.0
+        index = np.arange(start, start + k, dtype=np.float64)
+        drift = index * a.drift_rate
+        if a.drift_amplitude:
+            drift += a.drift_amplitude * np.sin(index * (2 * np.pi / a.drift_period))
+        if a.drift_walk:
+            steps = self._rng.standard_normal(k)
+            steps *= a.drift_walk
+            steps[0] += self._walk
+            np.cumsum(steps, out=steps)
+            self._walk = float(steps[-1])
+            drift += steps
+        return drift
+
+
+    def _draw_block(self, true_weight: np.ndarray, measured: np.ndarray) -> None:
+        m, repeats = true_weight.size, self.assembly.repeats
+        with span("draw_parts", n=m, parts=self._tolerances.size):
+            parts = self._rng.standard_normal((m, self._tolerances.size), dtype=self.dtype)
+            parts *= self._tolerances
+            np.sum(parts, axis=1, out=true_weight)
+            del parts
+            true_weight += self.cube.base_weight
+        with span("draw_readings", n=m, repeats=repeats):
+            readings = self._rng.standard_normal((m, repeats), dtype=self.dtype)
+            readings *= self.scale.scale_error
+            readings += true_weight[:, None]
+            drift = self._drift(m * repeats)
+            if np.ndim(drift):
+                readings += drift.reshape(m, repeats)
+            if self.rounding is not None:
+                quantize(readings, self.scale.scale_resolution, self.rounding, out=readings)
+            np.mean(readings, axis=1, out=measured)
+
+
+    def _draw(self, n: int) -> tuple[np.ndarray, np.ndarray]:
+        self._fresh = False
+        true_weight = np.empty(n, dtype=self.dtype)
+        measured = np.empty(n, dtype=self.dtype)
+        block = max(1, BLOCK_ELEMENTS // max(self._tolerances.size, self.assembly.repeats))
+        for lo in range(0, n, block):
+            hi = min(lo + block, n)
+            self._draw_block(true_weight[lo:hi], measured[lo:hi])
+        return true_weight, measured
+
+
+    def _single_part_only(self, *args, **kwargs):
+        # deliberately unsupported, not unfinished
+        raise TypeError("Closed-form / importance-sampled estimates model a single part "
+                        "weighed once; simulate the assembly instead")
+
+    analytic = misclassification = compare_scales = _single_part_only
@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.profiling import span
+
+
+DEFAULT_MEMORY_LIMIT = 256 * 2 ** 20
+# bytes per resampled element: float32 weight plus its random bit
+_BYTES_PER_WEIGHT = 5
+# elements per block of the block sums used to locate quantiles (multiple of 8)
+_QUANTILE_BLOCK = 1024
+# random byte -> its 8 bits as float32 weights
+_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).astype(np.float32)
+
+
+def _weights(seeds, m: int, n: int) -> np.ndarray:
+    """One row of m random bits per seed as float32 (each from its own generator), zero from n on."""
+    packed = np.stack([np.random.default_rng(s).integers(0, 256, size=m // 8, dtype=np.uint8) for s in seeds])
+    bits = np.take(_BITS, packed, axis=0).reshape(len(seeds), m)
+    bits[:, n:] = 0.0
+    return bits
+
+
+def _locate(bits: np.ndarray, block_sums: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Index of the first element where the running weight of one resample reaches each target."""
+    cum_blocks = np.cumsum(block_sums)
+    block = np.searchsorted(cum_blocks, targets, side="left")
+    idx = np.empty(targets.size, dtype=np.int64)
+    for j, (b, t) in enumerate(zip(block, targets)):
+        lo = b * _QUANTILE_BLOCK
+        before = cum_blocks[b - 1] if b else 0.0
+        inside = np.cumsum(bits[lo:lo + _QUANTILE_BLOCK], dtype=np.float64)
+        idx[j] = lo + np.searchsorted(inside, t - before, side="left")
+    return idx
+
+
+def _batch(seeds, data: np.ndarray, n: int, quantiles: np.ndarray) -> tuple:
+    """mean / std / quantile indices of one resample per seed; data sorted, centered and padded."""
+    rows = len(seeds)
+    bits = _weights(seeds, data.shape[0], n)
+    # one pass over the weights for the total and both power sums (columns 1, x, x^2);
+    # every weight is 2 * bit
+    sums = 2.0 * (bits @ data).astype(np.float64)
+    total, s1, s2 = sums[:, 0], sums[:, 1], sums[:, 2]
+    mean = s1 / total
+    var = (s2 - s1 * mean) / (total - 1)
+    idx = np.empty((rows, quantiles.size), dtype=np.int64)
+    if quantiles.size:
+        # data is sorted: a quantile is where the running weight reaches q * total;
+        # block sums find the block, a short cumsum the element inside it
+        ones = np.ones(_QUANTILE_BLOCK, dtype=np.float32)
+        block_sums = (bits.reshape(rows, -1, _QUANTILE_BLOCK) @ ones).astype(np.float64)
+        targets = np.maximum(quantiles[None, :] * (total / 2)[:, None], 0.5)
+        for r in range(rows):
+            idx[r] = _locate(bits[r], block_sums[r], targets[r])
+    return mean, np.sqrt(np.maximum(var, 0.0)), idx
+
+
+def bootstrap(
+        x: np.ndarray,
+        quantiles=(),
+        resamples: int = 1000,
+        confidence: float = 0.95,
+        seed: int | np.random.SeedSequence | None = None,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+        workers: int = 1,
+) -> dict:
+    """
+    --- Bootstrap confidence intervals of mean, std and quantiles ---
+
+            Resamples use random weights with mean 1 and variance 1 like the
+            Poisson(1) counts of the Poisson bootstrap, but drawn as 0 or 2 from
+            single random bits ("double-or-nothing" bootstrap), which makes the
+            weights nearly free to generate. They are processed in batches of
+            as many resamples as fit into memory_limit; a batch is reduced with
+            one matrix product (weighted sums of 1, x and x^2) and, for
+            quantiles, block sums over the pre-sorted data. Batches can run on
+            `workers` threads; every resample has its own child seed, so the
+            result depends on neither the batch size nor the number of workers.
+
+            Returns {statistic: {"estimate", "std_error", "ci"}} with percentile
+            intervals, statistics "mean", "std" (ddof=1) and "q<quantile>".
+    """
+    x = np.asarray(x, dtype=np.float64)
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    n = x.size
+    if n < 2:
+        raise ValueError("bootstrap needs at least two samples")
+
+    with span("bootstrap_sort", n=n):
+        xs = np.sort(x)
+    shift = float(xs.mean())
+    # padded to whole quantile blocks with zero rows, which drop out of every sum
+    m = -(-n // _QUANTILE_BLOCK) * _QUANTILE_BLOCK
+    data = np.zeros((m, 3), dtype=np.float32)
+    data[:n, 0] = 1.0
+    data[:n, 1] = xs - shift
+    data[:n, 2] = np.square(data[:n, 1])
+
+    rows = max(1, int(memory_limit // (_BYTES_PER_WEIGHT * m * max(workers, 1))))
+    seeds = (seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)).spawn(resamples)
+    batches = [seeds[lo:lo + rows] for lo in range(0, resamples, rows)]
+
+    def run(batch):
+        with span("bootstrap_batch", rows=len(batch)):
+            return _batch(batch, data, n, quantiles)
+
+    if workers > 1:
+        with ThreadPoolExecutor(workers) as pool:
+            parts = list(pool.map(run, batches))
+    else:
+        parts = [run(b) for b in batches]
+
+    means = np.concatenate([p[0] for p in parts]) + shift
+    stds = np.concatenate([p[1] for p in parts])
+    idx = np.concatenate([p[2] for p in parts])
+
+    alpha = (1 - confidence) / 2
+    replicates = {"mean": (float(x.mean()), means), "std": (float(x.std(ddof=1)), stds)}
+    for j, q in enumerate(quantiles):
+        replicates[f"q{q:g}"] = (float(np.quantile(x, q, method="inverted_cdf")), xs[np.minimum(idx[:, j], n - 1)])
+    return {
+        name: {
+            "estimate": estimate,
+            "std_error": float(values.std(ddof=1)),
+            "ci": tuple(float(v) for v in np.quantile(values, [alpha, 1 - alpha])),
+        }
+        for name, (estimate, values) in replicates.items()
+    }
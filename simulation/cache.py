@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import time
+
+import numpy as np
+
+from simulation.result import SimulationResult
+from simulation.storage import stats_to_meta, hists_to_arrays, stream_state_from
+
+
+# bump whenever a change to the model would change simulated values
+MODEL_VERSION = 1
+
+
+class ResultCache:
+    """
+    --- Persistent, size-bounded cache of simulated populations ---
+
+            Entries are content-addressed by the frozen config dataclasses, the
+            seed, the sampling options and MODEL_VERSION. A full simulate() entry
+            holds the columns as .npy files (loaded memory-mapped) plus the
+            describe() table and histograms; a simulate_stream() entry holds the
+            running moments and fixed-edge histograms. Least recently used
+            entries are evicted once the cache grows beyond max_bytes.
+    """
+    def __init__(self, root: str | os.PathLike = ".cache/populations", max_bytes: int = 2 * 1024 ** 3) -> None:
+        self.root = pathlib.Path(root)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(params: dict) -> str:
+        blob = json.dumps({"model_version": MODEL_VERSION, **params}, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+    def _entry(self, key: str) -> pathlib.Path:
+        return self.root / key
+
+    def load(self, pop, key: str) -> bool:
+        """Fill pop from the entry for key; False on a miss."""
+        entry = self._entry(key)
+        try:
+            meta = json.loads((entry / "meta.json").read_text())
+            hist = np.load(entry / "hist.npz")
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            return False
+
+        pop._clear_results()
+        if meta["mode"] == "full":
+            true_weight = np.load(entry / "true_weight.npy", mmap_mode="r")
+            if meta["result"]["counts"]:
+                pop.result = SimulationResult(
+                    true_weight, measured_counts=np.load(entry / "measured_counts.npy", mmap_mode="r"),
+                    offset=meta["result"]["offset"], resolution=meta["result"]["resolution"],
+                )
+            else:
+                pop.result = SimulationResult(true_weight, np.load(entry / "measured.npy", mmap_mode="r"))
+            pop.result._describe = meta["describe"]
+            for col in pop.result.columns:
+                pop._hist_cache[(col, "auto")] = (hist[f"{col}_counts"], hist[f"{col}_edges"])
+        else:
+            pop.stats, pop.hists = stream_state_from(meta["stats"], hist)
+        os.utime(entry)     # LRU bookkeeping
+        return True
+
+    def store(self, pop, key: str, mode: str, params: dict) -> None:
+        """Write pop's current results as the entry for key, then evict to max_bytes."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{key}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+
+        meta = {"mode": mode, "params": params, "model_version": MODEL_VERSION, "created": time.time()}
+        hist = {}
+        if mode == "full":
+            result = pop.result
+            np.save(tmp / "true_weight.npy", result.true_weight)
+            if result.measured_counts is not None:
+                np.save(tmp / "measured_counts.npy", result.measured_counts)
+            else:
+                np.save(tmp / "measured.npy", result.measured)
+            meta["result"] = {
+                "counts": result.measured_counts is not None,
+                "offset": result.offset,
+                "resolution": result.resolution,
+            }
+            meta["describe"] = {
+                col: {stat: float(v) for stat, v in table.items()}
+                for col, table in pop.describe().items()
+            }
+            for col in result.columns:
+                hist[f"{col}_counts"], hist[f"{col}_edges"] = pop.histogram(col)
+        else:
+            meta["stats"] = stats_to_meta(pop.stats)
+            hist = hists_to_arrays(pop.hists)
+        np.savez(tmp / "hist.npz", **hist)
+        (tmp / "meta.json").write_text(json.dumps(meta, indent=2, default=str))
+
+        entry = self._entry(key)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+        self.evict(keep=key)
+
+    @staticmethod
+    def _size(entry: pathlib.Path) -> int:
+        return sum(f.stat().st_size for f in entry.iterdir())
+
+    def evict(self, keep: str | None = None) -> None:
+        """Drop least recently used entries until the cache fits max_bytes."""
+        entries = [e for e in self.root.iterdir() if e.is_dir() and not e.name.startswith(".")]
+        sizes = {e: self._size(e) for e in entries}
+        total = sum(sizes.values())
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= sizes[entry]
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,224 @@
+"""
+Fit CubeConfig.part_tolerance and ScaleConfig.scale_error from weighing logs.
+
+Every unit in the log is weighed one or more times. Under the simulation's
+model a reading is
+
+    reading = base_weight + unit deviation + scale error
+              N(0, part_tolerance^2)   N(0, scale_error^2)
+
+so the spread of repeated readings of one unit is the scale error and the
+spread of the unit means is the part tolerance. Both variance components
+come from a one-way random-effects ANOVA whose sufficient statistics are
+accumulated chunk by chunk in one pass, so logs larger than memory can be
+fitted:
+
+    MS_within  = sum of squares within units / (N - k)     -> scale_error^2
+    MS_between = n-weighted squares of unit means / (k - 1)
+    part_tolerance^2 = (MS_between - MS_within) / n0,  n0 = (N - sum n_i^2 / N) / (k - 1)
+
+Readings of one unit are expected to be contiguous in the log (a unit that
+continues in the next chunk is carried over); grouped=False drops that
+assumption at the cost of per-unit state in memory.
+"""
+import math
+
+import numpy as np
+
+import config as cfg
+from utils.profiling import span
+
+
+# record layout of binary logs: unit id, reading
+BINARY_DTYPE = np.dtype([("unit", "<i8"), ("reading", "<f8")])
+
+
+class _AnovaSums:
+    """One-pass sufficient statistics of the one-way random-effects ANOVA."""
+    def __init__(self) -> None:
+        self.units = 0
+        self.readings = 0
+        self.sum_n2 = 0.0
+        self.ss_within = 0.0
+        # n-weighted running mean / sum of squares of the unit means
+        self.mean = 0.0
+        self.ss_between = 0.0
+
+    def add_units(self, n: np.ndarray, means: np.ndarray, ss: np.ndarray) -> None:
+        """Merge complete units given by reading count, mean and within sum of squares."""
+        if n.size == 0:
+            return
+        w = n.sum()
+        mean = float(np.dot(n, means) / w)
+        ss_between = float(np.dot(n, np.square(means - mean)))
+        total = self.readings + w
+        delta = mean - self.mean
+        # Chan et al. merge of weighted moments
+        self.ss_between += ss_between + delta * delta * self.readings * w / total
+        self.mean += delta * w / total
+        self.readings = int(total)
+        self.units += n.size
+        self.sum_n2 += float(np.dot(n, n))
+        self.ss_within += float(ss.sum())
+
+
+def _unit_stats(units: np.ndarray, readings: np.ndarray):
+    """Run starts, reading counts, means and within sums of squares of contiguous unit runs."""
+    starts = np.concatenate(([0], np.flatnonzero(units[1:] != units[:-1]) + 1))
+    n = np.diff(np.append(starts, units.size))
+    means = np.add.reduceat(readings, starts) / n
+    ss = np.add.reduceat(np.square(readings - np.repeat(means, n)), starts)
+    return starts, n, means, ss
+
+
+def _merge_unit(a: tuple, b: tuple) -> tuple:
+    """Merge (n, mean, ss) of the same unit split over two chunks."""
+    n = a[0] + b[0]
+    delta = b[1] - a[1]
+    return n, a[1] + delta * b[0] / n, a[2] + b[2] + delta * delta * a[0] * b[0] / n
+
+
+def _on_grid(readings: np.ndarray) -> float | None:
+    """Resolution of readings that all sit on one grid (smallest step between distinct values), else None."""
+    values = np.unique(readings)
+    if values.size < 3:
+        return None
+    step = float(np.diff(values).min())
+    steps = (values - values[0]) / step
+    if step <= 0 or np.abs(steps - np.rint(steps)).max() > 1e-3:
+        return None
+    # quantize to a clean decimal, e.g. 0.009999999 -> 0.01
+    return float(f"{step:.6g}")
+
+
+def iter_csv(path, unit_column: str = "unit_id", reading_column: str = "reading", chunk_rows: int = 1_000_000):
+    """(units, readings) chunks of a CSV log, read with pandas in chunks."""
+    import pandas as pd
+    for chunk in pd.read_csv(path, usecols=[unit_column, reading_column], chunksize=chunk_rows):
+        yield chunk[unit_column].to_numpy(), chunk[reading_column].to_numpy(dtype=np.float64)
+
+
+def iter_binary(path, record_dtype: np.dtype = BINARY_DTYPE, chunk_rows: int = 1_000_000):
+    """(units, readings) chunks of a binary log of fixed-size records, memory-mapped."""
+    record_dtype = np.dtype(record_dtype)
+    records = np.memmap(path, dtype=record_dtype, mode="r")
+    names = record_dtype.names
+    for lo in range(0, records.size, chunk_rows):
+        chunk = records[lo:lo + chunk_rows]
+        yield np.asarray(chunk[names[0]]), np.asarray(chunk[names[1]], dtype=np.float64)
+
+
+def fit_variance_components(
+        chunks,
+        grouped: bool = True,
+        resolution: float | None = None,
+        weight_unit: str = "g",
+        base_scale: cfg.scale.ScaleConfig = cfg.scale.cube_scale,
+) -> dict:
+    """
+    --- Fitted cube / scale configs from (units, readings) chunks ---
+
+            chunks yields pairs of equally long arrays (iter_csv, iter_binary or
+            anything else). resolution is the scale's display step; None infers
+            it from the first chunk when the readings sit on a grid. Rounding to
+            that step adds resolution^2 / 12 to the within-unit variance, which
+            is taken off again (Sheppard's correction).
+
+            Returns the fitted CubeConfig and ScaleConfig (units weight_unit,
+            resolution from base_scale when none is known) plus the ANOVA
+            statistics behind them.
+    """
+    sums = _AnovaSums()
+    pending = None          # (unit id, n, mean, ss) of the unit the last chunk ended in
+    per_unit = None         # grouped=False: pandas frame of per-unit count / sum / sum of squares
+    shift = None
+    inferred = resolution is None
+    with span("calibrate"):
+        for units, readings in chunks:
+            if readings.size == 0:
+                continue
+            if shift is None:
+                shift = float(readings[0])
+                if resolution is None:
+                    resolution = _on_grid(readings)
+            y = readings - shift
+            if not grouped:
+                import pandas as pd
+                frame = pd.DataFrame({"unit": units, "s": y, "q": y * y})
+                agg = frame.groupby("unit").agg(n=("s", "size"), s=("s", "sum"), q=("q", "sum"))
+                per_unit = agg if per_unit is None else per_unit.add(agg, fill_value=0)
+                continue
+
+            starts, n, means, ss = _unit_stats(units, y)
+            first = (n[0], means[0], ss[0])
+            if pending is not None:
+                if units[0] == pending[0]:
+                    first = _merge_unit(pending[1:], first)
+                else:
+                    sums.add_units(*(np.array([v]) for v in pending[1:]))
+            n[0], means[0], ss[0] = first
+            # the last unit may continue in the next chunk
+            pending = (units[starts[-1]], n[-1], means[-1], ss[-1])
+            sums.add_units(n[:-1], means[:-1], ss[:-1])
+
+        if pending is not None:
+            sums.add_units(*(np.array([v]) for v in pending[1:]))
+        if per_unit is not None:
+            n = per_unit["n"].to_numpy(dtype=np.float64)
+            means = per_unit["s"].to_numpy() / n
+            sums.add_units(n, means, np.maximum(per_unit["q"].to_numpy() - n * means * means, 0.0))
+
+    if sums.units < 2 or sums.readings <= sums.units:
+        raise ValueError("Need at least two units and some repeated readings to separate the variances")
+
+    ms_within = sums.ss_within / (sums.readings - sums.units)
+    ms_between = sums.ss_between / (sums.units - 1)
+    n0 = (sums.readings - sums.sum_n2 / sums.readings) / (sums.units - 1)
+    quantization = resolution ** 2 / 12 if resolution else 0.0
+    scale_variance = max(ms_within - quantization, 0.0)
+    part_variance = max((ms_between - ms_within) / n0, 0.0)
+
+    cube = cfg.cube.CubeConfig(
+        base_weight=float(sums.mean + shift),
+        base_weight_unit=weight_unit,
+        part_tolerance=math.sqrt(part_variance),
+        tolerance_unit=weight_unit,
+    )
+    scale = cfg.scale.ScaleConfig(
+        scale_error=math.sqrt(scale_variance),
+        scale_error_unit=weight_unit,
+        scale_resolution=resolution or base_scale.scale_resolution,
+        resolution_unit=weight_unit,
+    )
+    return {
+        "cube": cube,
+        "scale": scale,
+        "units": sums.units,
+        "readings": sums.readings,
+        "ms_within": ms_within,
+        "ms_between": ms_between,
+        "n0": n0,
+        "part_variance": part_variance,
+        "scale_variance": scale_variance,
+        "resolution": resolution,
+        "resolution_inferred": inferred and resolution is not None,
+    }
+
+
+def calibrate(path, fmt: str | None = None, chunk_rows: int = 1_000_000, **kwargs) -> dict:
+    """
+    fit_variance_components() of a log file: CSV (unit_column / reading_column
+    options) or binary records (record_dtype option, default BINARY_DTYPE); fmt is
+    taken from the file extension (.csv, anything else binary) when not given.
+    """
+    fmt = fmt or ("csv" if str(path).lower().endswith(".csv") else "binary")
+    readers = {"csv": (iter_csv, ("unit_column", "reading_column")), "binary": (iter_binary, ("record_dtype",))}
+    if fmt not in readers:
+        raise ValueError(f"Unknown log format {fmt!r}, choose one of {list(readers)}")
+    reader, option_names = readers[fmt]
+    for other in readers.values():
+        for name in set(other[1]) - set(option_names):
+            if name in kwargs:
+                raise ValueError(f"Option {name!r} does not apply to {fmt} logs")
+    reader_options = {k: kwargs.pop(k) for k in option_names if k in kwargs}
+    return fit_variance_components(reader(path, chunk_rows=chunk_rows, **reader_options), **kwargs)
@@ -0,0 +1,99 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from simulation.analytic import tolerance_band
+from simulation.quantize import quantize
+from simulation.stats import RunningMoments
+
+
+METRICS = ("mean_err", "abs_err", "sq_err", "misclassified")
+
+
+def _as_dict(scales) -> dict:
+    if isinstance(scales, dict):
+        return scales
+    return {str(i): s for i, s in enumerate(scales)}
+
+
+def compare_scales(
+        pop,
+        scales,
+        reference: str | None = None,
+        band: tuple[float, float] | None = None,
+        shared_errors: bool = True,
+        chunk_size: int = 1_000_000,
+        confidence: float = 0.95,
+) -> pd.DataFrame:
+    """
+    --- Compare scale configs on one set of cubes (common random numbers) ---
+
+            The true weights of pop's population are drawn once and weighed on
+            every scale in `scales` ({name: ScaleConfig} or a list) as rows of
+            2-D arrays. With shared_errors the scales also share one standard
+            normal error draw per cube, scaled by each scale_error, so only the
+            scale parameters differ between the rows.
+
+            Per-cube metrics: mean_err (signed error), abs_err, sq_err and
+            misclassified (reading and true weight on different sides of band).
+            Each scale gets the metric mean and the paired difference to the
+            reference scale (first one by default) with its confidence interval.
+            independent_se is what the difference's standard error would be
+            with separately drawn populations, for comparison.
+    """
+    scales = _as_dict(scales)
+    names = list(scales)
+    reference = reference or names[0]
+    ref = names.index(reference)
+    band = band or tolerance_band(pop.cube)
+    base, tol = pop.cube.base_weight, pop.cube.part_tolerance
+    sigma = np.array([scales[k].scale_error for k in names])[:, None]
+    resolution = np.array([scales[k].scale_resolution for k in names])[:, None]
+
+    values = {m: RunningMoments() for m in METRICS}
+    diffs = {m: RunningMoments() for m in METRICS}
+    remaining = int(pop.n)
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        remaining -= n
+        draws = pop.sampler.normals(n, (tol,) + (1.0,) * (1 if shared_errors else len(names)))
+        true_weight = draws[0] + base
+        z = draws[1][None, :] if shared_errors else np.stack(draws[1:])
+
+        measured = true_weight + sigma * z
+        if pop.rounding is not None:
+            quantize(measured, resolution, pop.rounding, out=measured)
+        err = measured - true_weight
+        true_in = (true_weight >= band[0]) & (true_weight <= band[1])
+        measured_in = (measured >= band[0]) & (measured <= band[1])
+        per_cube = {
+            "mean_err": err,
+            "abs_err": np.abs(err),
+            "sq_err": err * err,
+            "misclassified": (measured_in != true_in).astype(np.float64),
+        }
+        for metric, x in per_cube.items():
+            values[metric].update(x)
+            diffs[metric].update(x - x[ref])
+
+    z_crit = NormalDist().inv_cdf(0.5 + confidence / 2)
+    count = int(pop.n)
+    rows = []
+    for metric in METRICS:
+        std = values[metric].std
+        for i, name in enumerate(names):
+            se = float(diffs[metric].std[i]) / math.sqrt(count)
+            diff = float(diffs[metric].mean[i])
+            rows.append({
+                "scale": name,
+                "metric": metric,
+                "value": float(values[metric].mean[i]),
+                "diff": diff,
+                "diff_low": diff - z_crit * se,
+                "diff_high": diff + z_crit * se,
+                "diff_se": se,
+                "independent_se": math.sqrt((std[i] ** 2 + std[ref] ** 2) / count),
+            })
+    return pd.DataFrame(rows)
@@ -0,0 +1,157 @@
+import math
+from dataclasses import replace
+
+import numpy as np
+
+import config as cfg
+from simulation.analytic import analytic_summary, tolerance_band
+from simulation.quantize import quantize
+
+
+TARGETS = ("misclassification", "false_reject", "false_accept", "error_quantile")
+# candidate resolutions in units of the base scale's resolution
+DEFAULT_RESOLUTION_STEPS = (1000, 500, 200, 100, 50, 20, 10, 5, 2, 1)
+
+
+class _Evaluator:
+    """
+    Memoized metric of one cube for (scale_error, scale_resolution) pairs.
+
+    Misclassification rates come from the closed form (or importance sampling
+    with a fixed seed), error quantiles from one shared set of draws: the
+    true weights and standard-normal errors are drawn once, every scale
+    reuses them (common random numbers), so the metric is a smooth,
+    deterministic function of the scale parameters and bisection is stable.
+    """
+    def __init__(self, cube_cfg, base_scale, target, band, rounding, quantile, method, n, seed) -> None:
+        self.cube, self.base_scale = cube_cfg, base_scale
+        self.target, self.band, self.rounding = target, band, rounding
+        self.quantile, self.method, self.n, self.seed = quantile, method, n, seed
+        self.memo: dict[tuple[float, float], float] = {}
+        self.log: list[dict] = []
+        self._draws = None
+
+    def _shared_draws(self):
+        if self._draws is None:
+            from simulation.population import Population
+            pop = Population(self.cube, cfg.population.PopulationConfig(self.n), self.base_scale, seed=self.seed)
+            true_weight, z = pop.sampler.normals(int(self.n), (self.cube.part_tolerance, 1.0))
+            true_weight += self.cube.base_weight
+            self._draws = true_weight, z
+        return self._draws
+
+    def _compute(self, scale) -> float:
+        if self.target == "error_quantile":
+            true_weight, z = self._shared_draws()
+            measured = true_weight + scale.scale_error * z
+            if self.rounding is not None:
+                quantize(measured, scale.scale_resolution, self.rounding, out=measured)
+            measured -= true_weight
+            return float(np.quantile(np.abs(measured), self.quantile))
+        if self.method == "importance":
+            from simulation.misclassification import misclassification_rates
+            rates = misclassification_rates(self.cube, scale, self.band, n=self.n, seed=self.seed,
+                                            rounding=self.rounding)
+            rates = {k: rates[k]["rate"] for k in ("false_reject", "false_accept")}
+        else:
+            rates = analytic_summary(self.cube, scale, self.band, self.rounding)
+        if self.target == "misclassification":
+            return rates["false_reject"] + rates["false_accept"]
+        return rates[self.target]
+
+    def __call__(self, error: float, resolution: float) -> float:
+        key = (error, resolution)
+        if key not in self.memo:
+            scale = replace(self.base_scale, scale_error=error, scale_resolution=resolution)
+            self.memo[key] = self._compute(scale)
+            self.log.append({"scale_error": error, "scale_resolution": resolution, "value": self.memo[key]})
+        return self.memo[key]
+
+
+def optimize_scale(
+        cube_cfg: cfg.cube.CubeConfig,
+        target: str,
+        limit: float,
+        resolutions=None,
+        base_scale: cfg.scale.ScaleConfig = cfg.scale.cube_scale,
+        band: tuple[float, float] | None = None,
+        rounding: str | None = "nearest",
+        quantile: float = 0.99,
+        method: str = "analytic",
+        n: int = 1_000_000,
+        seed: int = 0,
+        error_range: tuple[float, float] | None = None,
+        rtol: float = 0.01,
+        cost=None,
+) -> dict:
+    """
+    --- Loosest ScaleConfig that still meets a target ---
+
+            target is one of TARGETS and must stay <= limit:
+              misclassification / false_reject / false_accept   rate for band
+              error_quantile    `quantile` of |measurement_err| (shared draws)
+            method "analytic" (closed form) or "importance" (seeded importance
+            sampling) for the rates.
+
+            For every candidate resolution (coarsest first, default: multiples
+            of base_scale's resolution) the largest scale_error meeting the target
+            is found by bisection in log space to a relative precision rtol. The
+            metric grows with the error, so each resolution's answer is a lower
+            bracket for the next finer one (warm start). Evaluations are memoized.
+
+            Returns the frontier (resolution -> largest allowed error), the chosen
+            scale (largest allowed error, ties to the coarser resolution, or the
+            minimum of cost(ScaleConfig) if given), the evaluation count and log.
+    """
+    if target not in TARGETS:
+        raise ValueError(f"Unknown target {target!r}, choose one of {list(TARGETS)}")
+    if method not in ("analytic", "importance"):
+        raise ValueError(f"Unknown method {method!r}, choose 'analytic' or 'importance'")
+    band = band or tolerance_band(cube_cfg)
+    if rounding is None:
+        resolutions = [base_scale.scale_resolution]
+    elif resolutions is None:
+        resolutions = [base_scale.scale_resolution * s for s in DEFAULT_RESOLUTION_STEPS]
+    resolutions = sorted(resolutions, reverse=True)
+    lo_err, hi_err = error_range or (cube_cfg.part_tolerance * 1e-4, cube_cfg.part_tolerance * 10)
+
+    evaluate = _Evaluator(cube_cfg, base_scale, target, band, rounding, quantile, method, n, seed)
+    frontier = []
+    feasible_lo = None
+    for resolution in resolutions:
+        hi = hi_err
+        # warm start: the coarser resolution's answer usually still meets the target
+        lo = feasible_lo if feasible_lo is not None and evaluate(feasible_lo, resolution) <= limit else lo_err
+        if evaluate(hi, resolution) <= limit:
+            best = hi     # the whole range meets the target
+        elif evaluate(lo, resolution) > limit:
+            continue      # even the most precise scale in range fails at this resolution
+        else:
+            # invariant: lo meets the target, hi does not
+            while hi / lo > 1 + rtol:
+                mid = math.sqrt(lo * hi)
+                if evaluate(mid, resolution) <= limit:
+                    lo = mid
+                else:
+                    hi = mid
+            best = lo
+        feasible_lo = best
+        frontier.append({"scale_resolution": resolution, "scale_error": best,
+                         "value": evaluate(best, resolution)})
+
+    chosen = None
+    if frontier:
+        if cost is None:
+            point = max(frontier, key=lambda p: (p["scale_error"], p["scale_resolution"]))
+        else:
+            point = min(frontier, key=lambda p: cost(replace(
+                base_scale, scale_error=p["scale_error"], scale_resolution=p["scale_resolution"])))
+        chosen = replace(base_scale, scale_error=point["scale_error"], scale_resolution=point["scale_resolution"])
+    return {
+        "scale": chosen,
+        "target": target,
+        "limit": limit,
+        "frontier": frontier,
+        "evaluations": len(evaluate.log),
+        "log": evaluate.log,
+    }
@@ -0,0 +1,92 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulation.stats import RunningMoments
+from utils import profiling
+
+
+DEFAULT_BLOCK_SIZE = 100_000
+
+
+def _block_seeds(seed_seq: np.random.SeedSequence, n_blocks: int) -> list[np.random.SeedSequence]:
+    """
+    Child streams for every block, derived from the block index only.
+
+    Equivalent to seed_seq.spawn(n_blocks) on a fresh SeedSequence, but does not
+    depend on (or advance) how many children were spawned before.
+    """
+    return [
+        np.random.SeedSequence(seed_seq.entropy, spawn_key=seed_seq.spawn_key + (i,))
+        for i in range(n_blocks)
+    ]
+
+
+def _available_cpus() -> int:
+    """CPUs this process may run on (respects affinity masks where the OS reports them)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _simulate_block(pop, chunk_size: int, bins: int, trace_state: dict | None = None):
+    """One block's moments / histograms, plus the spans it recorded when run in a worker process."""
+    profiling.start_worker(trace_state)
+    stats = pop.simulate_stream(chunk_size=chunk_size, bins=bins)
+    spans = profiling.take_spans() if trace_state is not None else []
+    return stats, pop.hists, spans
+
+
+def simulate_parallel(
+        pop,
+        workers: int | None = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        chunk_size: int | None = None,
+        bins: int = 200,
+) -> dict[str, RunningMoments]:
+    """
+    --- Simulate a population across a process pool ---
+
+            population_size is cut into blocks of block_size, each drawn from its
+            own SeedSequence child stream. Block results are merged in block order,
+            so for a given seed the moments and histograms are bit-identical for
+            any number of workers (block_size has to stay the same). While
+            profiling is enabled, the spans recorded in the worker processes are
+            sent back and added to the trace with their block index.
+    """
+    n = int(pop.n)
+    if n == 0:
+        # nothing to split: empty moments / histograms, like simulate_stream()
+        pop._clear_results()
+        pop.stats, pop.hists = pop._new_stream_state(bins)
+        return pop.stats
+    n_blocks = -(-n // block_size)
+    sizes = [min(block_size, n - i * block_size) for i in range(n_blocks)]
+    seeds = _block_seeds(pop._seed_seq, n_blocks)
+    blocks = [pop._spawn(seed, size, start=i * block_size) for i, (seed, size) in enumerate(zip(seeds, sizes))]
+    chunk_size = chunk_size or block_size
+    workers = workers or _available_cpus()
+
+    if workers == 1 or n_blocks == 1:
+        results = [_simulate_block(block, chunk_size, bins) for block in blocks]
+    else:
+        trace_state = profiling.worker_state()
+        with ProcessPoolExecutor(max_workers=min(workers, n_blocks)) as pool:
+            results = list(pool.map(
+                _simulate_block, blocks,
+                [chunk_size] * n_blocks, [bins] * n_blocks, [trace_state] * n_blocks,
+                chunksize=max(1, n_blocks // (workers * 4)),
+            ))
+        for i, (_, _, spans) in enumerate(results):
+            profiling.add_spans(spans, block=i)
+
+    stats, hists, _ = results[0]
+    for block_stats, block_hists, _ in results[1:]:
+        for col in stats:
+            stats[col].merge(block_stats[col])
+            hists[col].merge(block_hists[col])
+
+    pop._clear_results()
+    pop.stats, pop.hists = stats, hists
+    return stats
@@ -1,7 +1,23 @@
+from dataclasses import asdict
+
 import config as cfg
 from utils.console_style import BOLD, RED, CYAN, RESET_ALL
+from utils.profiling import span
+from simulation.stats import RunningMoments, FixedHistogram
+from simulation.result import SimulationResult, format_table
+from simulation.quantize import quantize, to_counts, grid_origin, ROUNDING_MODES
+from simulation.sampling import make_sampler
 import numpy as np
-import pandas as pd
+
+
+COLUMNS = SimulationResult.columns
+DEFAULT_CHUNK_SIZE = 1_000_000
+# column -> (plot title, x label)
+PLOT_LABELS = {
+    "true_weight": ("True Weights", "Weight"),
+    "measured": ("Measured Weights", "Weight"),
+    "measurement_err": ("Error Distribution", "Error"),
+}
 
 
 class Population:
@@ -11,44 +27,328 @@ class Population:
             cube_cfg: cfg.cube,
             pop_cfg: cfg.population,
             scale_cfg: cfg.scale,
-            seed: int | None = None
+            seed: int | np.random.SeedSequence | None = None,
+            dtype=np.float64,
+            rounding: str | None = None,
+            store_counts: bool = False,
+            sampler="pseudo",
+            cache=None,
     ) -> None:
-        self._rng = np.random.default_rng(seed)
-        if seed is not None: np.random.seed(seed)
+        self._seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self._rng = np.random.default_rng(self._seed_seq)
+        # results of a seeded population's first run can come from a ResultCache
+        self.cache = cache
+        self._fresh = seed is not None
         self.cube = cube_cfg
         self.n = pop_cfg.population_size
         self.scale = scale_cfg
-        self.df : pd.DataFrame | None = None
+        # "pseudo", "sobol" or a sampler instance, see simulation.sampling
+        self.sampler = make_sampler(sampler, self._rng)
+        # float32 halves the storage, but draws a different stream than float64
+        self.dtype = np.dtype(dtype)
+        # rounding mode for snapping readings to scale_resolution, None keeps them continuous
+        if rounding is not None and rounding not in ROUNDING_MODES:
+            raise ValueError(f"Unknown rounding mode {rounding!r}, choose one of {list(ROUNDING_MODES)}")
+        if store_counts and rounding is None:
+            raise ValueError("store_counts needs a rounding mode")
+        self.rounding = rounding
+        self.store_counts = store_counts
+        self.result: SimulationResult | None = None
+        # filled by simulate_stream() instead of result
+        self.stats: dict[str, RunningMoments] | None = None
+        self.hists: dict[str, FixedHistogram] | None = None
+        # (column, bins) -> (counts, edges), cleared whenever results change
+        self._hist_cache: dict = {}
+
+
+    def _spawn(self, seed: np.random.SeedSequence, n: int, start: int = 0) -> "Population":
+        """
+        Fresh population with the same configs and n samples for a parallel block
+        starting at sample `start`, with its own stream.
+        """
+        block = type(self)(
+            self.cube, cfg.population.PopulationConfig(population_size=n), self.scale,
+            seed=seed, dtype=self.dtype, rounding=self.rounding,
+        )
+        block.sampler = self.sampler.fork(block._rng, start)
+        return block
+
+
+    def _cache_params(self) -> dict:
+        """Everything that determines the simulated values, for the cache key."""
+        return {
+            "cube": asdict(self.cube),
+            "population_size": int(self.n),
+            "scale": asdict(self.scale),
+            "seed": [str(self._seed_seq.entropy), list(self._seed_seq.spawn_key)],
+            "dtype": self.dtype.name,
+            "rounding": self.rounding,
+            "store_counts": self.store_counts,
+            "sampler": [type(self.sampler).__name__, self.sampler.replicates],
+        }
+
+    def _cache_lookup(self, mode: str, **options) -> tuple[str, dict] | None:
+        """
+        (key, params) if this run may use the cache, after loading a hit into self
+        (params is None then). Only the first run of a seeded population is cached.
+        """
+        fresh, self._fresh = self._fresh, False
+        if self.cache is None or not fresh:
+            return None
+        params = {"mode": mode, **options, **self._cache_params()}
+        key = self.cache.key(params)
+        with span("cache_load"):
+            hit = self.cache.load(self, key)
+        if hit:
+            self._reseed_after_cached_run()
+            return key, None
+        return key, params
+
+    def _reseed_after_cached_run(self) -> None:
+        """
+        A cache hit skips the draws, so the generator cannot be where a real run
+        would leave it. Hit or miss, later runs therefore continue on a stream
+        derived from the seed (disjoint from the parallel block streams).
+        """
+        seed = np.random.SeedSequence(self._seed_seq.entropy, spawn_key=self._seed_seq.spawn_key + (2 ** 63,))
+        self._rng = np.random.default_rng(seed)
+        self.sampler = self.sampler.fork(self._rng, int(self.n))
+
+
+    def _draw(self, n: int) -> tuple[np.ndarray, np.ndarray]:
+        self._fresh = False
+        # in-place adds: no temporaries beyond the two returned arrays
+        with span("draw", n=n):
+            true_weight, measured_weight = self.sampler.normals(
+                n, (self.cube.part_tolerance, self.scale.scale_error), self.dtype)
+            true_weight += self.cube.base_weight
+            measured_weight += true_weight
+        if self.rounding is not None:
+            with span("quantize", n=n):
+                quantize(measured_weight, self.scale.scale_resolution, self.rounding, out=measured_weight)
+        return true_weight, measured_weight
+
 
+    def _iter_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Yield (true_weight, measured) chunks until population_size is reached."""
+        remaining = int(self.n)
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            yield self._draw(size)
+            remaining -= size
 
-    def simulate(self) -> pd.DataFrame:
+
+    def _sigmas(self) -> dict[str, float]:
+        """Model standard deviation of every column, used to place fixed histogram edges."""
+        tol, err = self.cube.part_tolerance, self.scale.scale_error
+        return {
+            "true_weight": tol,
+            "measured": float(np.hypot(tol, err)),
+            "measurement_err": err,
+        }
+
+
+    @property
+    def df(self):
+        """pandas view of the last simulate() result (None before that / after simulate_stream())."""
+        return self.result.to_pandas() if self.result is not None else None
+
+
+    def _clear_results(self) -> None:
+        self.result = None
+        self.stats = self.hists = None
+        self._hist_cache = {}
+
+
+    def simulate(self) -> SimulationResult:
         """
-        --- Generate Dataframe with all populations stats ---
+        --- Generate the result columns with all populations stats ---
 
                 Simulate true cube weights of population N based on part tolerances
                 Simulate measured cube weights based on real weights + random scale error
-                Calculate measurement error
+                (snapped to scale_resolution if a rounding mode is set)
+                Measurement error is derived from both on demand
         """
-        true_weight = self.cube.base_weight+ self._rng.normal(
-            loc=0,
-            scale=self.cube.part_tolerance,
-            size=self.n
-        )
+        with span("simulate", n=int(self.n)):
+            cached = self._cache_lookup("full")
+            if cached is not None and cached[1] is None:
+                return self.result
 
-        measured_weight = true_weight + self._rng.normal(
-            loc=0,
-            scale=self.scale.scale_error,
-            size=self.n
-        )
+            true_weight, measured_weight = self._draw(int(self.n))
+
+            self._clear_results()
+            with span("result"):
+                if self.store_counts:
+                    # int32 counts of resolution units relative to the grid point nearest base_weight
+                    origin = grid_origin(self.cube.base_weight, self.scale.scale_resolution)
+                    counts = to_counts(measured_weight, self.scale.scale_resolution, offset=origin)
+                    del measured_weight
+                    self.result = SimulationResult(
+                        true_weight, measured_counts=counts,
+                        offset=origin, resolution=self.scale.scale_resolution,
+                    )
+                else:
+                    self.result = SimulationResult(true_weight, measured_weight)
 
-        self.df = pd.DataFrame({
+            if cached is not None:
+                with span("cache_store"):
+                    self.cache.store(self, cached[0], "full", cached[1])
+                self._reseed_after_cached_run()
+            return self.result
+
+
+    def _new_stream_state(self, bins: int = 200) -> tuple[dict[str, RunningMoments], dict[str, FixedHistogram]]:
+        centers = {"true_weight": self.cube.base_weight, "measured": self.cube.base_weight, "measurement_err": 0.0}
+        sigmas = self._sigmas()
+        stats = {col: RunningMoments() for col in COLUMNS}
+        hists = {col: FixedHistogram.around(centers[col], sigmas[col], bins) for col in COLUMNS}
+        return stats, hists
+
+    @staticmethod
+    def _update_stream(stats, hists, true_weight, measured_weight) -> None:
+        chunk = {
             "true_weight": true_weight,
             "measured": measured_weight,
             "measurement_err": measured_weight - true_weight,
-        })
+        }
+        with span("stream_update", n=true_weight.size):
+            for col in COLUMNS:
+                stats[col].update(chunk[col])
+                hists[col].update(chunk[col])
+
+
+    def simulate_stream(
+            self,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            bins: int = 200,
+            progress=None,
+            should_stop=None,
+    ) -> dict[str, RunningMoments]:
+        """
+        --- Simulate the population chunk by chunk in constant memory ---
+
+                Same model as simulate(), but only running moments and fixed-edge
+                histograms of every column are kept. Memory use depends on
+                chunk_size and bins, not on population_size.
+
+                progress(done, hists) is called after every chunk; should_stop()
+                is checked right after it and ends the run early, leaving the
+                stats of the samples drawn so far. A stop request therefore
+                takes effect once the current chunk is finished.
+        """
+        with span("simulate_stream", n=int(self.n), chunk_size=chunk_size):
+            cached = self._cache_lookup("stream", chunk_size=chunk_size, bins=bins)
+            if cached is not None and cached[1] is None:
+                return self.stats
 
-        return self.df
+            stats, hists = self._new_stream_state(bins)
+            done = 0
+            for true_weight, measured_weight in self._iter_chunks(chunk_size):
+                self._update_stream(stats, hists, true_weight, measured_weight)
+                done += true_weight.size
+                if progress is not None:
+                    progress(done, hists)
+                if should_stop is not None and should_stop():
+                    cached = None    # never cache a partial run
+                    break
 
+            self._clear_results()
+            self.stats, self.hists = stats, hists
+            if cached is not None:
+                with span("cache_store"):
+                    self.cache.store(self, cached[0], "stream", cached[1])
+                self._reseed_after_cached_run()
+            return stats
+
+
+    def export(self, path, fmt: str = "npy", **kwargs):
+        """Columnar export of the samples and configs (simulated on the fly if needed), see simulation.storage."""
+        from simulation.storage import export_population
+        return export_population(self, path, fmt, **kwargs)
+
+    @staticmethod
+    def load(path, mmap: bool = True) -> "Population":
+        """Population saved with export(), columns memory-mapped, see simulation.storage."""
+        from simulation.storage import load_population
+        return load_population(path, mmap)
+
+    @staticmethod
+    def from_logs(path, pop_cfg: cfg.population, calibrate_options: dict | None = None, **kwargs) -> "Population":
+        """
+        Population with cube / scale configs fitted to a weighing log (calibrate_options go to
+        simulation.calibrate.calibrate, kwargs to Population).
+        """
+        from simulation.calibrate import calibrate
+        fit = calibrate(path, **(calibrate_options or {}))
+        return Population(fit["cube"], pop_cfg, fit["scale"], **kwargs)
+
+
+    def simulate_parallel(self, workers: int | None = None, **kwargs) -> dict[str, RunningMoments]:
+        """Streaming simulation split across a process pool, see simulation.parallel."""
+        from simulation.parallel import simulate_parallel
+        return simulate_parallel(self, workers=workers, **kwargs)
+
+
+
+    def simulate_until(self, targets: dict[str, float], **kwargs) -> dict:
+        """Sequential sampling until the CI of every target metric is narrow enough, see simulation.adaptive."""
+        from simulation.adaptive import simulate_until
+        return simulate_until(self, targets, **kwargs)
+
+
+    def compare_scales(self, scales, **kwargs):
+        """Paired comparison of scale configs on this population's cubes, see simulation.compare."""
+        from simulation.compare import compare_scales
+        self._fresh = False
+        return compare_scales(self, scales, **kwargs)
+
+
+    def production_line(self, block_size: int = 100_000, **kwargs):
+        """Endless blocks of readings with online SPC state, see simulation.production."""
+        from simulation.production import production_line
+        return production_line(self, block_size, **kwargs)
+
+
+    def replicate_estimate(self, statistic) -> dict:
+        """
+        --- Estimate and standard error from the sampler's replicates ---
+
+                statistic(true_weight, measured) -> float is evaluated on the
+                samples of every replicate of the last simulate() run (sample j
+                belongs to replicate j % replicates). With the Sobol sampler this
+                is the error estimate of randomized QMC; the pseudo-random
+                sampler has a single replicate and no error estimate.
+        """
+        result = self.result if self.result is not None else self.simulate()
+        r = self.sampler.replicates
+        true_weight, measured = result.true_weight, result.measured
+        values = np.array([statistic(true_weight[i::r], measured[i::r]) for i in range(r)])
+        return {
+            "estimate": float(values.mean()),
+            "std_error": float(values.std(ddof=1) / np.sqrt(r)) if r > 1 else float("nan"),
+            "replicates": values,
+        }
+
+
+    def analytic(self, band: tuple[float, float] | None = None, check: bool = False) -> dict:
+        """
+        Closed-form metrics for this cube / scale pair, see simulation.analytic.
+        check=True also runs the Monte-Carlo cross-check on this population
+        and returns it under "cross_check".
+        """
+        from simulation.analytic import analytic_summary, cross_check
+        metrics = analytic_summary(self.cube, self.scale, band, rounding=self.rounding)
+        if check:
+            metrics["cross_check"] = cross_check(self, band)
+        return metrics
+
+
+    def misclassification(self, band: tuple[float, float] | None = None, n: int = 100_000, **kwargs) -> dict:
+        """Importance-sampled false-reject / false-accept rates, see simulation.misclassification."""
+        from simulation.misclassification import misclassification_rates
+        self._fresh = False
+        return misclassification_rates(self.cube, self.scale, band, n=n, seed=self._rng,
+                                       rounding=self.rounding, **kwargs)
 
 
     def print_cube(self):
@@ -57,34 +357,87 @@ class Population:
         print(f"{CYAN}Part Tolerance:{RESET_ALL} {self.cube.part_tolerance}{self.cube.tolerance_unit}")
 
 
-    def summary(self) -> dict:
-        df = self.df() if self.df is not None else self.simulate()
-        print(df.describe())
-        return {
-            "mean_err": df.measurement_err.mean(),
-            "std_err": df.measurement_err.std(),
+    def describe(self) -> dict[str, dict]:
+        """describe()-style statistics per column, from the result or the streaming stats."""
+        if self.stats is not None:
+            return {col: s.describe() for col, s in self.stats.items()}
+        result = self.result if self.result is not None else self.simulate()
+        return result.describe()
+
+    def summary(self, confidence: float | None = None, **kwargs) -> dict:
+        """
+        Prints the describe() table and returns mean / std of measurement_err.
+        With a confidence level the bootstrap intervals (see bootstrap()) are
+        added as mean_err_ci / std_err_ci.
+        """
+        table = self.describe()
+        print(format_table(table))
+        summary = {
+            "mean_err": table["measurement_err"]["mean"],
+            "std_err": table["measurement_err"]["std"],
         }
+        if confidence is not None:
+            cis = self.bootstrap(confidence=confidence, **kwargs)
+            summary["mean_err_ci"] = cis["mean"]["ci"]
+            summary["std_err_ci"] = cis["std"]["ci"]
+            print(f"{confidence:.0%} CI  mean {summary['mean_err_ci']}  std {summary['std_err_ci']}")
+        return summary
 
-    def plot_errors(self, ax=None):
+    def bootstrap(self, column: str = "measurement_err", quantiles=(), **kwargs) -> dict:
+        """
+        Bootstrap CIs of mean, std and quantiles of one column of the simulate()
+        result, see simulation.bootstrap. Seeded populations get reproducible
+        intervals without touching the simulation stream.
+        """
+        from simulation.bootstrap import bootstrap
+        if self.result is None:
+            if self.stats is not None:
+                raise ValueError("bootstrap needs the samples of simulate(), not simulate_stream() statistics")
+            self.simulate()
+        kwargs.setdefault("seed", np.random.SeedSequence(
+            self._seed_seq.entropy, spawn_key=self._seed_seq.spawn_key + (2 ** 63 + 1,)))
+        return bootstrap(self.result[column], quantiles=quantiles, **kwargs)
+
+    def histogram(self, column: str, bins="auto") -> tuple[np.ndarray, np.ndarray]:
+        """
+        --- Counts and bin edges of one column ---
+
+                Binned once with NumPy and cached until the population is
+                simulated again. After simulate_stream() the fixed-edge
+                histograms are returned and bins is ignored.
+        """
+        key = (column, bins if isinstance(bins, (str, int)) else tuple(bins))
+        if key not in self._hist_cache:
+            if self.hists is not None:
+                hist = self.hists[column]
+                self._hist_cache[key] = (hist.counts, hist.edges)
+            else:
+                result = self.result if self.result is not None else self.simulate()
+                with span("histogram", column=column):
+                    self._hist_cache[key] = np.histogram(result[column], bins=bins)
+        return self._hist_cache[key]
+
+    def _plot_column(self, column, ax):
         import matplotlib.pyplot as plt
-        df = self.df if self.df is not None else self.simulate()
-        ax = ax or plt.gca()
-        ax.hist(df.measurement_err, bins='auto')
-        ax.set(title="Error Distribution", xlabel="Error", ylabel="Count")
-        return ax
+        with span("plot", column=column):
+            ax = ax or plt.gca()
+            # pre-binned counts: drawing cost depends on the bin count, not population size
+            counts, edges = self.histogram(column)
+            return plot_counts(ax, column, counts, edges)
+
+    def plot_errors(self, ax=None):
+        return self._plot_column("measurement_err", ax)
 
     def plot_measured_weights(self, ax=None):
-        import matplotlib.pyplot as plt
-        df = self.df if self.df is not None else self.simulate()
-        ax = ax or plt.gca()
-        ax.hist(df.measured, bins='auto')
-        ax.set(title="Measured Weights", xlabel="Weight", ylabel="Count")
-        return ax
+        return self._plot_column("measured", ax)
 
     def plot_true_weights(self, ax=None):
-        import matplotlib.pyplot as plt
-        df = self.df if self.df is not None else self.simulate()
-        ax = ax or plt.gca()
-        ax.hist(df.true_weight, bins='auto')
-        ax.set(title="True Weights", xlabel="Weight", ylabel="Count")
-        return ax
+        return self._plot_column("true_weight", ax)
+
+
+def plot_counts(ax, column: str, counts: np.ndarray, edges: np.ndarray):
+    """Draw pre-binned counts of one column with the standard title / labels."""
+    title, xlabel = PLOT_LABELS[column]
+    ax.stairs(counts, edges, fill=True)
+    ax.set(title=title, xlabel=xlabel, ylabel="Count")
+    return ax
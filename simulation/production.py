@@ -0,0 +1,151 @@
+import math
+from collections.abc import Iterator
+
+import numpy as np
+
+from utils.profiling import span
+
+
+class OnlineSPC:
+    """
+    --- Incremental control-chart state of a stream of readings ---
+
+            Fed one block of readings at a time; every statistic is updated with
+            vectorized O(1)-per-reading work and carried exactly across blocks:
+
+              ewma        exponentially weighted mean (weight lam), closed form
+                          per sub-block plus a carry between sub-blocks
+              rolling     mean / std of the last `window` readings, from a
+                          buffer of the previous window and the new block
+              shewhart    individual readings outside target ± limit*sigma
+              ewma chart  ewma outside its asymptotic limit*sigma*sqrt(lam/(2-lam))
+              cusum       upper / lower tabular CUSUM with reference k*sigma and
+                          decision interval h*sigma, via the Lindley recursion
+                          S_t = C_t - min(0, min_{s<=t} C_s) on cumulative sums
+
+            Alarms are counted per block; for the CUSUMs only the onsets (first
+            reading above h) count, the sums are not reset after a signal.
+    """
+    def __init__(
+            self,
+            target: float,
+            sigma: float,
+            lam: float = 0.2,
+            window: int = 1000,
+            limit: float = 3.0,
+            k: float = 0.5,
+            h: float = 5.0,
+    ) -> None:
+        if not 0 < lam <= 1:
+            raise ValueError("lam must be in (0, 1]")
+        self.target, self.sigma = target, sigma
+        self.lam, self.window, self.limit = lam, window, limit
+        self.k, self.h = k, h
+        self.count = 0
+        self.ewma = target
+        self.cusum_pos = self.cusum_neg = 0.0
+        # last `window` deviations from target, oldest first
+        self._buffer = np.empty(0)
+        # sub-block length keeping (1-lam)^-L far from overflow
+        decay = 1 - lam
+        self._sub = max(1, min(4096, int(200 / -math.log(decay)))) if decay > 0 else 1
+        powers = decay ** np.arange(self._sub + 1)
+        self._decay = powers[:-1]                   # (1-lam)^j
+        self._growth = 1 / powers[:-1] if decay > 0 else np.ones(1)
+        self._tail = powers[-1]                     # (1-lam)^L
+
+    def _ewma(self, x: np.ndarray) -> np.ndarray:
+        """z_j = (1-lam) z_{j-1} + lam x_j for the whole block."""
+        if self.lam == 1:
+            return x.copy()
+        n, sub = x.size, self._sub
+        rows = -(-n // sub)
+        padded = np.zeros(rows * sub)
+        padded[:n] = x
+        padded = padded.reshape(rows, sub)
+        # within a sub-block: z_j = (1-lam)^(j+1) z_start + lam (1-lam)^j sum_i (1-lam)^-i x_i
+        z = np.cumsum(padded * self._growth, axis=1)
+        z *= self._decay
+        z *= self.lam
+        # carry the start value from sub-block to sub-block (rows = n / L scalar steps)
+        starts = np.empty(rows)
+        carry = self.ewma
+        for r in range(rows):
+            starts[r] = carry
+            carry = self._tail * carry + z[r, -1]
+        z += (self._decay * (1 - self.lam)) * starts[:, None]
+        return z.ravel()[:n]
+
+    def _rolling(self, dev: np.ndarray) -> tuple[float, float]:
+        """Mean / std (ddof=1) of the deviations in the current window, buffer updated."""
+        joined = np.concatenate((self._buffer, dev))[-self.window:]
+        self._buffer = joined
+        if joined.size < 2:
+            return float(joined.mean()) if joined.size else math.nan, math.nan
+        s1, s2 = joined.sum(), np.dot(joined, joined)
+        var = (s2 - s1 * s1 / joined.size) / (joined.size - 1)
+        return float(s1 / joined.size), math.sqrt(max(var, 0.0))
+
+    @staticmethod
+    def _cusum(y: np.ndarray, start: float) -> np.ndarray:
+        c = np.cumsum(y)
+        c += start
+        return c - np.minimum(np.minimum.accumulate(c), 0.0)
+
+    def update(self, readings: np.ndarray) -> dict:
+        """Feed one block of readings; returns the state after it and the block's alarms."""
+        x = np.asarray(readings, dtype=np.float64)
+        start = self.count
+        with span("spc_update", n=x.size):
+            dev = x - self.target
+            z = self._ewma(x)
+            self.ewma = float(z[-1])
+
+            ref = self.k * self.sigma
+            pos = self._cusum(dev - ref, self.cusum_pos)
+            neg = self._cusum(-dev - ref, self.cusum_neg)
+            h = self.h * self.sigma
+            onsets = {}
+            for name, s, prev in (("cusum_pos", pos, self.cusum_pos), ("cusum_neg", neg, self.cusum_neg)):
+                above = s > h
+                onsets[name] = int(np.count_nonzero(above[1:] & ~above[:-1])) + int(above[0] and prev <= h)
+            self.cusum_pos, self.cusum_neg = float(pos[-1]), float(neg[-1])
+
+            shewhart = np.abs(dev) > self.limit * self.sigma
+            ewma_limit = self.limit * self.sigma * math.sqrt(self.lam / (2 - self.lam))
+            ewma_alarm = np.abs(z - self.target) > ewma_limit
+            rolling_mean, rolling_std = self._rolling(dev)
+            self.count += x.size
+
+        first = np.flatnonzero(shewhart | ewma_alarm | (pos > h) | (neg > h))
+        return {
+            "start": start,
+            "count": self.count,
+            "ewma": self.ewma,
+            "rolling_mean": rolling_mean + self.target,
+            "rolling_std": rolling_std,
+            "cusum_pos": self.cusum_pos,
+            "cusum_neg": self.cusum_neg,
+            "shewhart_alarms": int(np.count_nonzero(shewhart)),
+            "ewma_alarms": int(np.count_nonzero(ewma_alarm)),
+            "cusum_pos_alarms": onsets["cusum_pos"],
+            "cusum_neg_alarms": onsets["cusum_neg"],
+            "first_alarm": int(start + first[0]) if first.size else None,
+        }
+
+
+def production_line(pop, block_size: int = 100_000, **spc_kwargs) -> Iterator[tuple[np.ndarray, dict]]:
+    """
+    --- Unbounded stream of weighings from pop's model ---
+
+            Yields (measured readings, OnlineSPC state) per block forever, ignoring
+            population_size; stop by breaking out of the loop. The charts are
+            centered on base_weight with the model sigma of the readings unless
+            target / sigma are passed (together with the other OnlineSPC options).
+    """
+    spc_kwargs.setdefault("target", pop.cube.base_weight)
+    spc_kwargs.setdefault("sigma", pop._sigmas()["measured"])
+    spc = OnlineSPC(**spc_kwargs)
+    while True:
+        _, measured = pop._draw(block_size)
+        yield measured, spc.update(measured)
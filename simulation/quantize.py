@@ -0,0 +1,64 @@
+import numpy as np
+
+
+def _half_up(x, out=None):
+    x = np.add(x, 0.5, out=out)
+    return np.floor(x, out=x)
+
+
+# rounding mode -> ufunc-like callable f(x, out=...)
+ROUNDING_MODES = {
+    "nearest": np.rint,      # half to even, like most scale firmware
+    "half_up": _half_up,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "truncate": np.trunc,
+}
+
+
+def _rounder(rounding: str):
+    try:
+        return ROUNDING_MODES[rounding]
+    except KeyError:
+        raise ValueError(f"Unknown rounding mode {rounding!r}, choose one of {list(ROUNDING_MODES)}") from None
+
+
+def quantize(weight: np.ndarray, resolution: float, rounding: str = "nearest",
+             offset: float = 0.0, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Snap weights to the scale resolution grid (offset + k * resolution).
+    Pass out=weight to quantize in place.
+    """
+    x = np.subtract(weight, offset, out=out)
+    x /= resolution
+    _rounder(rounding)(x, out=x)
+    x *= resolution
+    x += offset
+    return x
+
+
+def grid_origin(weight, resolution):
+    """
+    Grid point k * resolution nearest to weight. Counts relative to it stay
+    small (int32) while the readings keep the scale's absolute grid.
+    """
+    return np.rint(np.divide(weight, resolution)) * resolution
+
+
+def to_counts(weight: np.ndarray, resolution: float, offset: float = 0.0,
+              rounding: str = "nearest", dtype=np.int32) -> np.ndarray:
+    """Integer number of resolution units relative to offset."""
+    x = np.subtract(weight, offset)
+    x /= resolution
+    _rounder(rounding)(x, out=x)
+    info = np.iinfo(dtype)
+    if x.size and (x.min() < info.min or x.max() > info.max):
+        raise OverflowError(f"Readings do not fit into {np.dtype(dtype).name} counts of {resolution}")
+    return x.astype(dtype)
+
+
+def from_counts(counts: np.ndarray, resolution: float, offset: float = 0.0, dtype=np.float64) -> np.ndarray:
+    x = counts.astype(dtype)
+    x *= resolution
+    x += offset
+    return x
@@ -0,0 +1,82 @@
+import math
+from dataclasses import asdict
+
+from utils.profiling import span
+
+
+def format_population_size(size: float) -> str:
+    """Population size as mathtext, e.g. 1000000 -> $1\\times10^{6}$."""
+    if size > 9999:
+        exp = int(math.log10(size))
+        mant = size / (10 ** exp)
+        # Display integer mantissa if possible
+        mant_str = str(int(mant)) if mant.is_integer() else f"{mant:.2f}"
+        return f"${mant_str}\\times10^{{{exp}}}$"
+    return str(size)
+
+
+def _new_axes(fig=None):
+    if fig is None:
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(8, 12))
+    else:
+        fig.clear()
+    return fig, fig.subplots(3, 1, gridspec_kw={'hspace': 0.4})
+
+
+def build_figure(pop, fig=None):
+    """
+    --- Report figure of one simulated population ---
+
+            True weights, measured weights and errors stacked vertically with a
+            config text box. Built on a bare Figure, so no pyplot / GUI backend
+            is involved. Pass fig to redraw an existing (e.g. embedded) figure.
+    """
+    with span("build_figure"):
+        fig, axes = _new_axes(fig)
+        pop.plot_true_weights(ax=axes[0])
+        pop.plot_measured_weights(ax=axes[1])
+        pop.plot_errors(ax=axes[2])
+        _add_config_text(fig, pop.cube, pop.n, pop.scale)
+    return fig
+
+
+def draw_partial(fig, pop, hists, done: int):
+    """Redraw fig from the fixed-edge histograms of a run that is still going."""
+    from simulation.population import plot_counts
+    fig, axes = _new_axes(fig)
+    for ax, column in zip(axes, ("true_weight", "measured", "measurement_err")):
+        plot_counts(ax, column, hists[column].counts, hists[column].edges)
+    _add_config_text(fig, pop.cube, pop.n, pop.scale,
+                     footer=f"Progress: {format_population_size(done)} / {format_population_size(pop.n)}")
+    return fig
+
+
+def _add_config_text(fig, cube_cfg, population_size, scale_cfg, footer: str = ""):
+    cfg_text = (
+        f"Cube base weight: {cube_cfg.base_weight}{cube_cfg.base_weight_unit}\n"
+        f"Cube tolerance: {cube_cfg.part_tolerance}{cube_cfg.tolerance_unit}\n"
+        f"Population config: {format_population_size(population_size)}\n"
+        f"Scale config: {scale_cfg.scale_error}{scale_cfg.scale_error_unit}\n"
+        f"{footer}"
+    )
+    # Place a text box in the upper right corner
+    fig.text(
+        0.95, 0.95, cfg_text,
+        ha='right', va='top', fontsize=10,
+        bbox=dict(boxstyle="round,pad=0.3", facecolor="white", edgecolor="gray", alpha=0.5)
+    )
+    fig.subplots_adjust(top=0.85, bottom=0.1)
+
+
+def summary_metrics(pop) -> dict:
+    """JSON-ready configs and per-column statistics of a simulated population."""
+    return {
+        "cube": asdict(pop.cube),
+        "population_size": int(pop.n),
+        "scale": asdict(pop.scale),
+        "columns": {
+            col: {stat: float(value) for stat, value in stats.items()}
+            for col, stats in pop.describe().items()
+        },
+    }
@@ -0,0 +1,101 @@
+import numpy as np
+
+from utils.profiling import span
+
+
+def format_table(columns: dict[str, dict]) -> str:
+    """Plain-text table like DataFrame.describe(), without importing pandas."""
+    rows = list(next(iter(columns.values())))
+    width = max(14, *(len(c) + 2 for c in columns))
+    lines = [" " * 6 + "".join(f"{c:>{width}}" for c in columns)]
+    for row in rows:
+        lines.append(f"{row:<6}" + "".join(f"{stats[row]:>{width}.6f}" for stats in columns.values()))
+    return "\n".join(lines)
+
+
+class SimulationResult:
+    """
+    --- Columnar result of Population.simulate() ---
+
+            Only true_weight and measured are stored as NumPy arrays,
+            measurement_err is derived on access. Columns can be read like
+            DataFrame columns (result["measured"] or result.measured);
+            to_pandas() builds a DataFrame only when one is asked for.
+
+            Quantized readings can instead be stored as integer counts of
+            resolution units relative to offset (measured_counts); measured
+            is then decoded on access.
+    """
+    columns = ("true_weight", "measured", "measurement_err")
+
+    def __init__(
+            self,
+            true_weight: np.ndarray,
+            measured: np.ndarray | None = None,
+            *,
+            measured_counts: np.ndarray | None = None,
+            offset: float = 0.0,
+            resolution: float = 1.0,
+    ) -> None:
+        if (measured is None) == (measured_counts is None):
+            raise ValueError("Pass either measured or measured_counts")
+        self.true_weight = true_weight
+        self._measured = measured
+        self.measured_counts = measured_counts
+        self.offset = offset
+        self.resolution = resolution
+        self._frame = None
+        self._describe = None
+
+    @property
+    def measured(self) -> np.ndarray:
+        if self._measured is not None:
+            return self._measured
+        from simulation.quantize import from_counts
+        return from_counts(self.measured_counts, self.resolution, self.offset, dtype=self.true_weight.dtype)
+
+    @property
+    def measurement_err(self) -> np.ndarray:
+        return self.measured - self.true_weight
+
+    @property
+    def nbytes(self) -> int:
+        stored = self._measured if self._measured is not None else self.measured_counts
+        return self.true_weight.nbytes + stored.nbytes
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        if column not in self.columns:
+            raise KeyError(column)
+        return getattr(self, column)
+
+    def __len__(self) -> int:
+        return self.true_weight.size
+
+    def describe(self) -> dict[str, dict]:
+        """count / mean / std / min / quartiles / max per column, like DataFrame.describe()."""
+        if self._describe is not None:
+            return self._describe
+        out = {}
+        for col in self.columns:
+            x = self[col]
+            q25, q50, q75 = np.quantile(x, [0.25, 0.5, 0.75])
+            out[col] = {
+                "count": x.size,
+                "mean": x.mean(dtype=np.float64),
+                "std": x.std(ddof=1, dtype=np.float64),
+                "min": x.min(),
+                "25%": q25,
+                "50%": q50,
+                "75%": q75,
+                "max": x.max(),
+            }
+        self._describe = out
+        return out
+
+    def to_pandas(self):
+        """DataFrame with all three columns, built once on first request."""
+        if self._frame is None:
+            import pandas as pd
+            with span("dataframe", n=len(self)):
+                self._frame = pd.DataFrame({col: self[col] for col in self.columns}, copy=False)
+        return self._frame
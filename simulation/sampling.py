@@ -0,0 +1,152 @@
+import copy
+
+import numpy as np
+
+from simulation.analytic import norm_ppf
+
+
+class PseudoRandomSampler:
+    """
+    --- Plain pseudo-random normals from a numpy Generator ---
+
+            Dimensions are drawn one after the other, exactly like separate
+            rng.normal() calls.
+    """
+    replicates = 1
+
+    def __init__(self, rng: np.random.Generator) -> None:
+        self.rng = rng
+
+    def normals(self, n: int, scales, dtype=np.float64) -> list[np.ndarray]:
+        """One array of n N(0, scale^2) draws per entry of scales."""
+        out = []
+        for scale in scales:
+            if np.dtype(dtype) == np.float64:
+                out.append(self.rng.normal(loc=0, scale=scale, size=n))
+            else:
+                x = self.rng.standard_normal(size=n, dtype=dtype)
+                x *= scale
+                out.append(x)
+        return out
+
+    def fork(self, rng: np.random.Generator, start: int) -> "PseudoRandomSampler":
+        """Sampler for a parallel block: an independent stream, start is irrelevant."""
+        return PseudoRandomSampler(rng)
+
+
+# Joe & Kuo (new-joe-kuo-6.21201) primitive polynomials for dimensions 2..10:
+# (degree s, coefficients a, initial direction numbers m)
+_JOE_KUO = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+)
+_BITS = 32
+
+
+def _direction_numbers(max_dims: int) -> np.ndarray:
+    """(max_dims, 32) Sobol direction numbers as 32-bit integers, MSB first."""
+    v = np.zeros((max_dims, _BITS), dtype=np.uint64)
+    v[0] = [1 << (_BITS - 1 - k) for k in range(_BITS)]
+    for d, (s, a, m) in enumerate(_JOE_KUO[:max_dims - 1], start=1):
+        for k in range(_BITS):
+            if k < s:
+                v[d, k] = m[k] << (_BITS - 1 - k)
+            else:
+                value = int(v[d, k - s]) ^ (int(v[d, k - s]) >> s)
+                for j in range(1, s):
+                    if (a >> (s - 1 - j)) & 1:
+                        value ^= int(v[d, k - j])
+                v[d, k] = value
+    return v
+
+
+def _parity(x: np.ndarray) -> np.ndarray:
+    for shift in (16, 8, 4, 2, 1):
+        x = x ^ (x >> np.uint64(shift))
+    return x & np.uint64(1)
+
+
+def _scramble(v: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Random linear matrix scramble (Matousek): digit j of every direction number
+    becomes the parity of the digits i <= j picked by a random lower-triangular
+    binary matrix with unit diagonal.
+    """
+    out = np.zeros_like(v)
+    for d in range(v.shape[0]):
+        for j in range(_BITS):
+            bit = np.uint64(1 << (_BITS - 1 - j))
+            # digits above j (more significant) are random, digit j itself is kept
+            higher = ~np.uint64((1 << (_BITS - j)) - 1) & np.uint64((1 << _BITS) - 1)
+            row = (np.uint64(rng.integers(0, 1 << _BITS, dtype=np.uint64)) & higher) | bit
+            out[d] |= _parity(v[d] & row) * bit
+    return out
+
+
+class SobolSampler:
+    """
+    --- Randomized quasi-Monte Carlo normals from scrambled Sobol points ---
+
+            Every replicate uses its own random linear scramble and digital
+            shift of the Sobol sequence; uniforms are mapped through the inverse
+            normal CDF. Samples are interleaved across replicates (sample j
+            belongs to replicate j % replicates), so any prefix of the stream is
+            balanced and the spread between replicate estimates gives an honest
+            error estimate (see Population.replicate_estimate).
+    """
+    max_dims = len(_JOE_KUO) + 1
+
+    def __init__(self, replicates: int = 16, seed: int | np.random.Generator | None = None) -> None:
+        rng = np.random.default_rng(seed)
+        base = _direction_numbers(self.max_dims)
+        self.replicates = replicates
+        self._v = np.stack([_scramble(base, rng) for _ in range(replicates)])
+        self._shift = rng.integers(0, 1 << _BITS, size=(replicates, self.max_dims), dtype=np.uint64)
+        self._pos = 0
+
+    def uniforms(self, n: int, dims: int) -> np.ndarray:
+        """(dims, n) points in (0, 1), continuing where the last call stopped."""
+        if dims > self.max_dims:
+            raise ValueError(f"Sobol direction numbers only cover {self.max_dims} dimensions")
+        j = np.arange(self._pos, self._pos + n, dtype=np.uint64)
+        self._pos += n
+        rep = (j % np.uint64(self.replicates)).astype(np.intp)
+        idx = j // np.uint64(self.replicates)
+        gray = idx ^ (idx >> np.uint64(1))
+
+        x = self._shift[rep, :dims].T.copy()
+        for b in range(max(int(idx.max()).bit_length(), 1) if n else 0):
+            hit = ((gray >> np.uint64(b)) & np.uint64(1)).astype(bool)
+            x[:, hit] ^= self._v[rep[hit], :dims, b].T
+        return (x.astype(np.float64) + 0.5) / float(1 << _BITS)
+
+    def normals(self, n: int, scales, dtype=np.float64) -> list[np.ndarray]:
+        z = norm_ppf(self.uniforms(n, len(scales)))
+        return [(z[d] * scale).astype(dtype, copy=False) for d, scale in enumerate(scales)]
+
+    def fork(self, rng: np.random.Generator, start: int) -> "SobolSampler":
+        """Same scrambled sequence, continued at sample `start` (for parallel blocks)."""
+        forked = copy.copy(self)
+        forked._pos = start
+        return forked
+
+
+SAMPLERS = ("pseudo", "sobol")
+
+
+def make_sampler(kind, rng: np.random.Generator):
+    """Sampler instance from a name in SAMPLERS (or an already built sampler)."""
+    if kind == "pseudo":
+        return PseudoRandomSampler(rng)
+    if kind == "sobol":
+        return SobolSampler(seed=rng)
+    if isinstance(kind, str):
+        raise ValueError(f"Unknown sampler {kind!r}, choose one of {list(SAMPLERS)}")
+    return kind
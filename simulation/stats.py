@@ -0,0 +1,107 @@
+import numpy as np
+
+
+class RunningMoments:
+    """
+    --- Mergeable running mean / std / min / max ---
+
+            Updated chunk by chunk (Chan et al. parallel variance update), so the
+            full sample never has to be held in memory. With 2-D chunks every
+            row is tracked separately and the moments become arrays.
+    """
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, x: np.ndarray) -> None:
+        x = np.asarray(x, dtype=np.float64)
+        if x.size == 0:
+            return
+        axis = None if x.ndim == 1 else -1
+        chunk = RunningMoments()
+        chunk.count = x.shape[-1]
+        chunk.mean = x.mean(axis=axis)
+        chunk.m2 = np.square(x - (chunk.mean if axis is None else chunk.mean[..., None])).sum(axis=axis)
+        chunk.min = x.min(axis=axis)
+        chunk.max = x.max(axis=axis)
+        self.merge(chunk)
+
+    def merge(self, other: "RunningMoments") -> None:
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        # not in place: states may be arrays shared with describe() snapshots
+        self.mean = self.mean + delta * other.count / n
+        self.m2 = self.m2 + other.m2 + delta * delta * self.count * other.count / n
+        self.count = n
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        # ddof=1, same as pandas
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan * self.m2
+
+    def describe(self) -> dict:
+        if self.count == 0:
+            # like pandas describe() of an empty column
+            return {"count": 0, "mean": np.nan, "std": np.nan, "min": np.nan, "max": np.nan}
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class FixedHistogram:
+    """
+    --- Histogram with edges fixed up front ---
+
+            Counts can be accumulated chunk by chunk and merged exactly.
+            Samples outside the edges are kept in `underflow` / `overflow`.
+    """
+    def __init__(self, edges: np.ndarray) -> None:
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(self.edges.size - 1, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+        # equal-width edges (as from around()) are binned arithmetically by np.histogram
+        bins = self.counts.size
+        self._uniform = bins > 0 and np.array_equal(
+            self.edges, np.linspace(self.edges[0], self.edges[-1], bins + 1))
+
+    @classmethod
+    def around(cls, center: float, sigma: float, bins: int = 200, k: float = 6.0) -> "FixedHistogram":
+        """Equal-width bins covering center ± k*sigma."""
+        sigma = sigma if sigma > 0 else 1.0
+        return cls(np.linspace(center - k * sigma, center + k * sigma, bins + 1))
+
+    def update(self, x: np.ndarray) -> None:
+        lo, hi = self.edges[0], self.edges[-1]
+        self.underflow += int(np.count_nonzero(x < lo))
+        self.overflow += int(np.count_nonzero(x > hi))
+        if self._uniform:
+            self.counts += np.histogram(x, bins=self.counts.size, range=(lo, hi))[0]
+            return
+        # same convention as np.histogram: last bin is closed on the right
+        idx = np.searchsorted(self.edges, x, side="right") - 1
+        idx[x == hi] = self.counts.size - 1
+        inside = idx[(x >= lo) & (x <= hi)]
+        self.counts += np.bincount(inside, minlength=self.counts.size)
+
+    def merge(self, other: "FixedHistogram") -> None:
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge histograms with different edges")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
@@ -0,0 +1,277 @@
+"""
+Columnar export of simulated populations and memory-mapped reload.
+
+A saved population is a directory:
+
+    meta.json           configs, seed, sampling options, column layout and
+                        the running moments of every column
+    hist.npz            fixed-edge histograms of every column
+    <column>.npy        format "npy": one plain .npy file per stored column
+    data.parquet        format "parquet": one row group per chunk
+    data.arrow          format "arrow": Arrow IPC file, one record batch per chunk
+
+Stored columns are true_weight and measured (or measured_counts when the
+population keeps int32 counts); measurement_err is derived as usual. Chunks
+are written as they are generated, so populations larger than memory can be
+exported. load_population() maps .npy columns (and single-batch Arrow files)
+zero-copy; Parquet is decoded into memory. Summaries and plots of a reloaded
+population come from the stored moments and histograms, so they do not
+touch the column data at all.
+
+pyarrow is only needed for the parquet / arrow formats.
+"""
+import json
+import os
+import pathlib
+import shutil
+from dataclasses import asdict
+
+import numpy as np
+
+import config as cfg
+from simulation.result import SimulationResult
+from simulation.stats import RunningMoments, FixedHistogram
+from simulation.quantize import to_counts, from_counts, grid_origin
+from simulation.sampling import PseudoRandomSampler, SobolSampler
+from utils.profiling import span
+
+
+FORMATS = ("npy", "parquet", "arrow")
+STORAGE_VERSION = 1
+
+
+def stats_to_meta(stats: dict[str, RunningMoments]) -> dict:
+    return {
+        col: {"count": s.count, "mean": float(s.mean), "m2": float(s.m2),
+              "min": float(s.min), "max": float(s.max)}
+        for col, s in stats.items()
+    }
+
+
+def hists_to_arrays(hists: dict[str, FixedHistogram]) -> dict[str, np.ndarray]:
+    arrays = {}
+    for col, h in hists.items():
+        arrays[f"{col}_counts"], arrays[f"{col}_edges"] = h.counts, h.edges
+        arrays[f"{col}_outside"] = np.array([h.underflow, h.overflow])
+    return arrays
+
+
+def stream_state_from(meta_stats: dict, hist) -> tuple[dict[str, RunningMoments], dict[str, FixedHistogram]]:
+    """Inverse of stats_to_meta / hists_to_arrays."""
+    stats, hists = {}, {}
+    for col, moments in meta_stats.items():
+        s = RunningMoments()
+        s.count, s.mean, s.m2 = moments["count"], moments["mean"], moments["m2"]
+        s.min, s.max = moments["min"], moments["max"]
+        stats[col] = s
+        h = FixedHistogram(hist[f"{col}_edges"])
+        h.counts = hist[f"{col}_counts"].copy()
+        h.underflow, h.overflow = (int(v) for v in hist[f"{col}_outside"])
+        hists[col] = h
+    return stats, hists
+
+
+class _NpyWriter:
+    def __init__(self, directory: pathlib.Path, n: int, dtypes: dict) -> None:
+        self.arrays = {
+            col: np.lib.format.open_memmap(directory / f"{col}.npy", mode="w+", dtype=dtype, shape=(n,))
+            for col, dtype in dtypes.items()
+        }
+        self.pos = 0
+
+    def write(self, columns: dict[str, np.ndarray]) -> None:
+        size = next(iter(columns.values())).size
+        for col, values in columns.items():
+            self.arrays[col][self.pos:self.pos + size] = values
+        self.pos += size
+
+    def close(self) -> None:
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
+
+
+class _ArrowWriter:
+    def __init__(self, directory: pathlib.Path, n: int, dtypes: dict, fmt: str) -> None:
+        import pyarrow as pa
+        self.pa = pa
+        self.schema = pa.schema([(col, pa.from_numpy_dtype(dtype)) for col, dtype in dtypes.items()])
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(directory / "data.parquet", self.schema)
+            self._write = self.writer.write_table
+            self._wrap = pa.Table.from_arrays
+        else:
+            self.sink = pa.OSFile(str(directory / "data.arrow"), "wb")
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+            self._write = self.writer.write_batch
+            self._wrap = pa.RecordBatch.from_arrays
+
+    def write(self, columns: dict[str, np.ndarray]) -> None:
+        self._write(self._wrap([self.pa.array(v) for v in columns.values()], schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+        if hasattr(self, "sink"):
+            self.sink.close()
+
+
+_SAMPLER_KINDS = {PseudoRandomSampler: "pseudo", SobolSampler: "sobol"}
+
+
+def _config_meta(pop) -> dict:
+    meta = {
+        "cube": asdict(pop.cube),
+        "population_size": int(pop.n),
+        "scale": asdict(pop.scale),
+        "seed": {"entropy": str(pop._seed_seq.entropy), "spawn_key": list(pop._seed_seq.spawn_key)},
+        "dtype": pop.dtype.name,
+        "rounding": pop.rounding,
+        "store_counts": pop.store_counts,
+        "sampler": {"kind": _SAMPLER_KINDS.get(type(pop.sampler), type(pop.sampler).__name__),
+                    "replicates": int(pop.sampler.replicates)},
+    }
+    if hasattr(pop, "assembly"):
+        meta["assembly"] = asdict(pop.assembly)
+    return meta
+
+
+def _chunks(pop, chunk_size: int):
+    """
+    (true_weight, measured, measured_counts or None) chunks of the existing
+    result, or freshly drawn ones. Stored counts are sliced as they are and only
+    the slice is decoded.
+    """
+    result = pop.result
+    if result is None:
+        for true_weight, measured in pop._iter_chunks(chunk_size):
+            yield true_weight, measured, None
+        return
+    for lo in range(0, len(result), chunk_size):
+        true_weight = np.asarray(result.true_weight[lo:lo + chunk_size])
+        if result.measured_counts is None:
+            yield true_weight, np.asarray(result.measured[lo:lo + chunk_size]), None
+        else:
+            counts = np.asarray(result.measured_counts[lo:lo + chunk_size])
+            yield true_weight, from_counts(counts, result.resolution, result.offset, dtype=true_weight.dtype), counts
+
+
+def export_population(pop, path, fmt: str = "npy", chunk_size: int = 1_000_000, bins: int = 200) -> pathlib.Path:
+    """
+    --- Write pop's samples and configs to the directory path ---
+
+            Exports the last simulate() result, or, if there is none, simulates
+            chunk by chunk straight into the file (pop then holds the running
+            moments / histograms, like after simulate_stream()). The directory
+            is written next to path and moved into place when complete.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, choose one of {list(FORMATS)}")
+    path = pathlib.Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    n = int(pop.n) if pop.result is None else len(pop.result)
+    dtypes = {"true_weight": pop.dtype}
+    if pop.store_counts:
+        dtypes["measured_counts"] = np.dtype(np.int32)
+    else:
+        dtypes["measured"] = pop.dtype
+    writer = _NpyWriter(tmp, n, dtypes) if fmt == "npy" else _ArrowWriter(tmp, n, dtypes, fmt)
+
+    had_result = pop.result is not None
+    # counts of an existing result keep their offset, fresh ones use the grid point nearest base_weight
+    if had_result and pop.result.measured_counts is not None:
+        origin = pop.result.offset
+    else:
+        origin = grid_origin(pop.cube.base_weight, pop.scale.scale_resolution)
+    stats, hists = pop._new_stream_state(bins)
+    with span("export_population", n=n, format=fmt):
+        for true_weight, measured, counts in _chunks(pop, chunk_size):
+            pop._update_stream(stats, hists, true_weight, measured)
+            if pop.store_counts:
+                if counts is None:
+                    counts = to_counts(measured, pop.scale.scale_resolution, offset=origin)
+                writer.write({"true_weight": true_weight, "measured_counts": counts})
+            else:
+                writer.write({"true_weight": true_weight, "measured": measured})
+        writer.close()
+
+    meta = {
+        "storage_version": STORAGE_VERSION,
+        "format": fmt,
+        "rows": n,
+        "columns": {col: np.dtype(d).name for col, d in dtypes.items()},
+        "offset": float(origin),
+        "resolution": pop.scale.scale_resolution,
+        "config": _config_meta(pop),
+        "stats": stats_to_meta(stats),
+    }
+    np.savez(tmp / "hist.npz", **hists_to_arrays(hists))
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2, default=str))
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+    if not had_result:
+        pop._clear_results()
+        pop.stats, pop.hists = stats, hists
+    return path
+
+
+def _read_columns(path: pathlib.Path, meta: dict, mmap: bool) -> dict[str, np.ndarray]:
+    if meta["format"] == "npy":
+        return {col: np.load(path / f"{col}.npy", mmap_mode="r" if mmap else None) for col in meta["columns"]}
+    import pyarrow as pa
+    if meta["format"] == "arrow":
+        source = pa.memory_map(str(path / "data.arrow")) if mmap else pa.OSFile(str(path / "data.arrow"))
+        table = pa.ipc.open_file(source).read_all()
+    else:
+        import pyarrow.parquet as pq
+        table = pq.read_table(path / "data.parquet", memory_map=mmap)
+    # zero-copy for a single chunk, concatenated otherwise
+    return {col: table.column(col).to_numpy() for col in meta["columns"]}
+
+
+def load_population(path, mmap: bool = True):
+    """
+    --- Population from a directory written by export_population() ---
+
+            The configs, seed and sampling options are restored, the columns
+            are memory-mapped (mmap=False reads them into memory) and the stored
+            moments / histograms back describe(), summary() and the plots.
+    """
+    from simulation.population import Population
+    path = pathlib.Path(path)
+    meta = json.loads((path / "meta.json").read_text())
+    conf = meta["config"]
+    seed = np.random.SeedSequence(int(conf["seed"]["entropy"]), spawn_key=tuple(conf["seed"]["spawn_key"]))
+    options = dict(seed=seed, dtype=conf["dtype"], rounding=conf["rounding"], store_counts=conf["store_counts"])
+    sampler = conf.get("sampler", {"kind": "pseudo", "replicates": 1})
+    if sampler["kind"] not in _SAMPLER_KINDS.values():
+        raise ValueError(f"Population was saved with a custom sampler {sampler['kind']!r}, which cannot be restored")
+    pop_cfg = cfg.population.PopulationConfig(population_size=conf["population_size"])
+    scale_cfg = cfg.scale.ScaleConfig(**conf["scale"])
+    if "assembly" in conf:
+        from simulation.assembly import AssemblyPopulation
+        assembly = {k: tuple(v) if isinstance(v, list) else v for k, v in conf["assembly"].items()}
+        pop = AssemblyPopulation(cfg.assembly.AssemblyConfig(**assembly), pop_cfg, scale_cfg, **options)
+    else:
+        pop = Population(cfg.cube.CubeConfig(**conf["cube"]), pop_cfg, scale_cfg, **options)
+    if sampler["kind"] == "sobol":
+        # built from the fresh generator, as make_sampler("sobol", ...) does
+        pop.sampler = SobolSampler(replicates=sampler["replicates"], seed=pop._rng)
+    # a loaded population has been simulated already: like after a cache hit,
+    # later runs continue on a stream derived from the seed
+    pop._fresh = False
+    pop._reseed_after_cached_run()
+
+    with span("load_population", format=meta["format"]):
+        columns = _read_columns(path, meta, mmap)
+        if "measured_counts" in columns:
+            pop.result = SimulationResult(columns["true_weight"], measured_counts=columns["measured_counts"],
+                                          offset=meta["offset"], resolution=meta["resolution"])
+        else:
+            pop.result = SimulationResult(columns["true_weight"], columns["measured"])
+        pop.stats, pop.hists = stream_state_from(meta["stats"], np.load(path / "hist.npz"))
+    return pop
@@ -0,0 +1,112 @@
+from dataclasses import replace
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+import config as cfg
+import utils.util_functions as utils
+from simulation.quantize import quantize, ROUNDING_MODES
+from simulation.sampling import make_sampler
+from simulation.stats import RunningMoments
+
+
+# upper bound on combinations x samples held in memory at once
+MAX_BATCH_ELEMENTS = 8_000_000
+
+
+def config_grid(base, **values) -> dict:
+    """
+    Custom presets from one base config, e.g.
+    config_grid(cfg.cube.default, part_tolerance=[1.0, 2.0, 5.0])
+    Returns {name: config} with one entry per combination of the given values.
+    """
+    keys = list(values)
+    grid = {}
+    for combo in product(*(values[k] for k in keys)):
+        name = ",".join(f"{k}={v}" for k, v in zip(keys, combo))
+        grid[name] = replace(base, **dict(zip(keys, combo)))
+    return grid
+
+
+def _as_presets(configs, module: str) -> dict:
+    if configs is None:
+        return utils.gather_configs(cfg)[module]
+    if isinstance(configs, dict):
+        return configs
+    return {str(i): c for i, c in enumerate(configs)}
+
+
+def sweep(
+        cubes=None,
+        populations=None,
+        scales=None,
+        seed: int | None = None,
+        rounding: str | None = None,
+        sampler="pseudo",
+) -> pd.DataFrame:
+    """
+    --- Evaluate every cube x population x scale combination in one batch ---
+
+            cubes / populations / scales are {name: config} dicts, lists of configs,
+            or None to use every preset in the config package. All cube x scale
+            combinations are simulated together as rows of 2-D arrays sharing the
+            same standard normal draws; smaller population sizes are read off as
+            prefixes of the largest one. rounding snaps every row's readings to
+            its scale_resolution grid (k * resolution) like Population does;
+            sampler is "pseudo" or "sobol", see simulation.sampling.
+            Returns one tidy row of summary metrics per combination.
+    """
+    if rounding is not None and rounding not in ROUNDING_MODES:
+        raise ValueError(f"Unknown rounding mode {rounding!r}, choose one of {list(ROUNDING_MODES)}")
+    cubes = _as_presets(cubes, "cube")
+    populations = _as_presets(populations, "population")
+    scales = _as_presets(scales, "scale")
+
+    combos = list(product(cubes.items(), scales.items()))
+    base = np.array([c.base_weight for (_, c), _ in combos])[:, None]
+    tol = np.array([c.part_tolerance for (_, c), _ in combos])[:, None]
+    err = np.array([s.scale_error for _, (_, s) in combos])[:, None]
+    resolution = np.array([s.scale_resolution for _, (_, s) in combos])[:, None]
+
+    sizes = sorted({int(p.population_size) for p in populations.values()})
+    chunk_size = max(1, MAX_BATCH_ELEMENTS // len(combos))
+    sampler = make_sampler(sampler, np.random.default_rng(seed))
+    moments = {"measured": RunningMoments(), "measurement_err": RunningMoments()}
+    snapshots = {}
+
+    done = 0
+    for size in sizes:
+        while done < size:
+            n = min(chunk_size, size - done)
+            z_part, z_scale = sampler.normals(n, (1.0, 1.0))
+            true_weight = base + tol * z_part
+            measured = true_weight + err * z_scale
+            if rounding is not None:
+                quantize(measured, resolution, rounding, out=measured)
+            moments["measured"].update(measured)
+            moments["measurement_err"].update(measured - true_weight)
+            done += n
+        snapshots[size] = {col: m.describe() for col, m in moments.items()}
+
+    rows = []
+    for pop_name, pop_cfg in populations.items():
+        snap = snapshots[int(pop_cfg.population_size)]
+        for i, ((cube_name, cube_cfg), (scale_name, scale_cfg)) in enumerate(combos):
+            rows.append({
+                "cube": cube_name,
+                "population": pop_name,
+                "scale": scale_name,
+                "base_weight": cube_cfg.base_weight,
+                "part_tolerance": cube_cfg.part_tolerance,
+                "population_size": int(pop_cfg.population_size),
+                "scale_error": scale_cfg.scale_error,
+                "scale_resolution": scale_cfg.scale_resolution,
+                "mean_err": snap["measurement_err"]["mean"][i],
+                "std_err": snap["measurement_err"]["std"][i],
+                "min_err": snap["measurement_err"]["min"][i],
+                "max_err": snap["measurement_err"]["max"][i],
+                "mean_measured": snap["measured"]["mean"][i],
+                "std_measured": snap["measured"]["std"][i],
+            })
+    return pd.DataFrame(rows)
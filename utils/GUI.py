@@ -1,14 +1,12 @@
 import os
 import pathlib
-import tempfile
+import queue
 import tkinter as tk
 from tkinter import ttk
 from tkinter.filedialog import askdirectory, askopenfilename
 
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from ttkbootstrap import Style
 from ttkbootstrap.dialogs import Messagebox
-from PyPDF2 import PdfReader, PdfWriter
 
 import config as cfg
 import utils.util_functions as utils
@@ -17,8 +15,10 @@ import utils.util_functions as utils
 class Application(tk.Tk):
     """
     Main application window for the Strap Weight Simulation GUI.
+    Without a figure the window starts empty and runs are started from the
+    Simulate tab.
     """
-    def __init__(self, fig):
+    def __init__(self, fig=None):
         super().__init__()
         self.title('Strap Weight Simulation')
         self.style = Style('darkly')
@@ -27,6 +27,9 @@ class Application(tk.Tk):
         self.resizable(width=False, height=True)
 
         # Store the Matplotlib figure
+        if fig is None:
+            from matplotlib.figure import Figure
+            fig = Figure(figsize=(8, 12))
         self.fig = fig
 
         # Create and pack the file browser frame
@@ -53,7 +56,17 @@ class FileBrowser(ttk.Frame):
         self.decision_var = tk.StringVar(value='extend')
 
         # Simulation config options
+        self.configs = utils.gather_configs(cfg)
         self.config_names = utils.gather_config_names(cfg)
+        self.cube_var = tk.StringVar(value='heavy')
+        self.population_var = tk.StringVar(value='large')
+        # custom population size (e.g. 1e7), overrides the preset when set
+        self.population_size_var = tk.StringVar()
+        self.scale_var = tk.StringVar(value='cube_scale')
+        self.seed_var = tk.StringVar(value='42')
+        self.status_var = tk.StringVar(value='Idle')
+        self.progress_var = tk.DoubleVar(value=0.0)
+        self.worker = None
 
         # ---------------------------------------------------------------------
         # Grid layout configuration
@@ -73,8 +86,10 @@ class FileBrowser(ttk.Frame):
 
         # Tabs
         tab_results = ttk.Frame(nb)
+        tab_simulate = ttk.Frame(nb)
         tab_save = ttk.Frame(nb)
         nb.add(tab_results, text='Results')
+        nb.add(tab_simulate, text='Simulate')
         nb.add(tab_save, text='Save')
 
         # Make Results tab expandable for figure
@@ -84,6 +99,7 @@ class FileBrowser(ttk.Frame):
 
         # Build contents
         self._build_scrollable_figure(tab_results)
+        self._build_simulate_controls(tab_simulate)
         self._build_save_controls(tab_save)
 
         # Handle tab change for toolbar
@@ -140,6 +156,7 @@ class FileBrowser(ttk.Frame):
         )
 
         # Embed the figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
         self.figure_canvas = FigureCanvasTkAgg(self.master.fig, master=inner)
         self.figure_canvas.draw()
         self.figure_canvas.get_tk_widget().pack(fill='both', expand=True)
@@ -149,6 +166,142 @@ class FileBrowser(ttk.Frame):
         self.toolbar.update()
         self.toolbar.pack_forget()
 
+    def _build_simulate_controls(self, parent):
+        """
+        Preset selection (or a custom population size, e.g. 1e7) plus Run / Cancel for a background simulation.
+        """
+        parent.columnconfigure(0, weight=1)
+
+        setup_frame = ttk.Labelframe(parent, text='Simulation setup', padding=(40, 10, 10, 5))
+        setup_frame.grid(row=0, column=0, padx=10, pady=10, sticky='ew')
+        setup_frame.columnconfigure(1, weight=1)
+
+        rows = (
+            ('Cube', self.cube_var, 'cube'),
+            ('Population', self.population_var, 'population'),
+            ('Scale', self.scale_var, 'scale'),
+        )
+        for row, (label, var, module) in enumerate(rows):
+            ttk.Label(setup_frame, text=label).grid(row=row, column=0, padx=10, pady=2, sticky='e')
+            ttk.Combobox(
+                setup_frame,
+                textvariable=var,
+                values=list(self.configs[module]),
+                state='readonly'
+            ).grid(row=row, column=1, sticky='ew', padx=10, pady=2)
+        ttk.Label(setup_frame, text='or size').grid(row=1, column=2, padx=(10, 2), pady=2, sticky='e')
+        ttk.Entry(setup_frame, textvariable=self.population_size_var, width=12).grid(
+            row=1, column=3, sticky='ew', padx=(2, 10), pady=2)
+        ttk.Label(setup_frame, text='Seed').grid(row=3, column=0, padx=10, pady=2, sticky='e')
+        ttk.Entry(setup_frame, textvariable=self.seed_var).grid(row=3, column=1, sticky='ew', padx=10, pady=2)
+
+        run_frame = ttk.Labelframe(parent, text='Run', padding=(40, 10, 10, 5))
+        run_frame.grid(row=1, column=0, padx=10, pady=2, sticky='ew')
+        run_frame.columnconfigure(0, weight=1)
+        ttk.Progressbar(
+            run_frame,
+            variable=self.progress_var,
+            maximum=1.0,
+            bootstyle='success-striped'
+        ).grid(row=0, column=0, sticky='ew', padx=10, pady=2)
+        self.run_button = ttk.Button(
+            run_frame,
+            text='Run',
+            command=self._start_simulation,
+            style='primary.TButton'
+        )
+        self.run_button.grid(row=0, column=1, sticky='ew', pady=2, padx=10)
+        self.cancel_button = ttk.Button(
+            run_frame,
+            text='Cancel',
+            command=self._cancel_simulation,
+            style='primary.Outline.TButton',
+            state='disabled'
+        )
+        self.cancel_button.grid(row=0, column=2, sticky='ew', pady=2, padx=10)
+        ttk.Label(run_frame, textvariable=self.status_var).grid(row=1, column=0, columnspan=3, padx=10, pady=2, sticky='w')
+
+    def _start_simulation(self):
+        from simulation.population import Population
+        from utils.worker import SimulationWorker
+
+        seed = self.seed_var.get().strip()
+        if seed and not seed.lstrip('-').isdigit():
+            Messagebox.show_error("Seed must be an integer or empty.")
+            return
+        pop_cfg = self.configs['population'][self.population_var.get()]
+        size = self.population_size_var.get().strip().replace('_', '').replace(',', '')
+        if size:
+            try:
+                value = float(size)
+            except ValueError:
+                value = 0.0
+            if not (value >= 1 and value.is_integer()):
+                Messagebox.show_error("Population size must be a positive whole number (e.g. 1e7) or empty.")
+                return
+            pop_cfg = cfg.population.PopulationConfig(population_size=value)
+        pop = Population(
+            self.configs['cube'][self.cube_var.get()],
+            pop_cfg,
+            self.configs['scale'][self.scale_var.get()],
+            seed=int(seed) if seed else None,
+        )
+        self.worker = SimulationWorker(pop)
+        self.worker.start()
+        self.run_button.configure(state='disabled')
+        self.cancel_button.configure(state='normal')
+        self.progress_var.set(0.0)
+        self.status_var.set('Running...')
+        self.after(100, self._poll_worker)
+
+    def _cancel_simulation(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.status_var.set('Cancelling...')
+
+    def _poll_worker(self):
+        """
+        Drain the worker queue from the Tk event loop. Only the newest progress
+        message is drawn, so slow redraws never pile up behind the simulation.
+        """
+        from simulation.report import build_figure, draw_partial
+
+        worker = self.worker
+        latest, final = None, None
+        while True:
+            try:
+                msg = worker.messages.get_nowait()
+            except queue.Empty:
+                break
+            if msg[0] == 'progress':
+                latest = msg
+            else:
+                final = msg
+
+        if final is None:
+            if latest is not None:
+                _, done, hists = latest
+                self.progress_var.set(done / worker.pop.n)
+                self.status_var.set(f'Running... {done:,} / {int(worker.pop.n):,}')
+                draw_partial(self.master.fig, worker.pop, hists, done)
+                self.figure_canvas.draw_idle()
+            self.after(100, self._poll_worker)
+            return
+
+        kind, payload = final
+        self.run_button.configure(state='normal')
+        self.cancel_button.configure(state='disabled')
+        self.worker = None
+        if kind == 'error':
+            self.status_var.set('Failed')
+            Messagebox.show_error(f"Simulation failed: {payload}")
+            return
+        build_figure(payload, fig=self.master.fig)
+        self.figure_canvas.draw_idle()
+        count = payload.stats['measured'].count
+        self.progress_var.set(count / payload.n)
+        self.status_var.set(f"{'Done' if kind == 'done' else 'Cancelled'}: {count:,} samples")
+
     def _build_save_controls(self, parent):
         """
         Builds the controls for creating or extending PDF files,
@@ -300,33 +453,12 @@ class FileBrowser(ttk.Frame):
             os.makedirs(folder, exist_ok=True)
             target = os.path.join(folder, f"{name}.pdf")
 
-        # Add title and underline
+        # Render in memory (title only on the exported page) and append
+        from utils.pdf_export import export_figures
+        from utils.profiling import span
         title_text = os.path.splitext(os.path.basename(target))[0]
-        if title_text:
-            txt = self.master.fig.suptitle(
-                title_text,
-                x=0.5, y=0.98,
-                horizontalalignment='center',
-                fontsize=16, fontweight='bold'
-            )
-            import matplotlib.lines as mlines
-            underline = mlines.Line2D([0.1, 0.9], [0.96, 0.96],
-                                      transform=self.master.fig.transFigure,
-                                      color=txt.get_color(), linewidth=1)
-            self.master.fig.add_artist(underline)
-
-        # Save and merge
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        self.master.fig.savefig(tmp.name)
-        writer = PdfWriter()
-        if os.path.exists(target):
-            for p in PdfReader(target).pages:
-                writer.add_page(p)
-        for p in PdfReader(tmp.name).pages:
-            writer.add_page(p)
-        with open(target, 'wb') as f:
-            writer.write(f)
-        os.remove(tmp.name)
+        with span("export_to_pdf", mode=mode):
+            export_figures(target, [self.master.fig], titles=[title_text])
 
         Messagebox.show_info("Saved to PDF")
         self.master.destroy()
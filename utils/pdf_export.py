@@ -0,0 +1,254 @@
+"""
+In-memory PDF export with append-only updates of existing reports.
+
+Figures are rendered into an in-memory PDF and appended to the target as a
+PDF incremental update (new objects + new xref section + trailer with /Prev),
+so the existing bytes of a growing report are never read page by page or
+rewritten. Files the incremental writer cannot handle (cross-reference
+streams, encryption, nested /Kids) fall back to a full PyPDF2 rewrite.
+Nothing here depends on Tk, so it works with and without the GUI.
+"""
+import io
+import os
+import re
+from contextlib import contextmanager
+
+from utils.profiling import span
+
+
+class _Unsupported(Exception):
+    """Existing file layout the incremental writer does not handle."""
+
+
+_OBJ_HEADER = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj\b")
+_REF = re.compile(rb"(\d+)\s+(\d+)\s+R\b")
+_STREAM = re.compile(rb">>\s*stream(?:\r\n|\n|\r)")
+
+
+@contextmanager
+def _titled(fig, title: str | None):
+    """Temporarily add a title and underline; the figure is left as it was."""
+    if not title:
+        yield
+        return
+    import matplotlib.lines as mlines
+    txt = fig.text(
+        0.5, 0.98, title,
+        horizontalalignment='center', verticalalignment='top',
+        fontsize=16, fontweight='bold'
+    )
+    underline = mlines.Line2D([0.1, 0.9], [0.96, 0.96],
+                              transform=fig.transFigure,
+                              color=txt.get_color(), linewidth=1)
+    fig.add_artist(underline)
+    try:
+        yield
+    finally:
+        txt.remove()
+        underline.remove()
+
+
+def render_pdf(figures, titles=None) -> bytes:
+    """Render figures as consecutive pages of one in-memory PDF."""
+    from matplotlib.backends.backend_pdf import PdfPages
+    titles = titles or [None] * len(figures)
+    buf = io.BytesIO()
+    with span("pdf_render", pages=len(figures)), PdfPages(buf) as pdf:
+        for fig, title in zip(figures, titles):
+            with _titled(fig, title):
+                pdf.savefig(fig)
+    return buf.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Minimal reader for classic xref tables
+# ---------------------------------------------------------------------------
+def _trailer(data: bytes, startxref: int) -> tuple[dict[int, tuple[int, int]], bytes]:
+    """Xref entries {obj: (offset, gen)} of one section and its trailer dict."""
+    if data[startxref:startxref + 4] != b"xref":
+        raise _Unsupported("cross-reference stream")
+    end = data.index(b"trailer", startxref)
+    tokens = data[startxref + 4:end].split()
+    entries, i = {}, 0
+    while i < len(tokens):
+        first, count = int(tokens[i]), int(tokens[i + 1])
+        i += 2
+        for k in range(count):
+            offset, gen, kind = tokens[i:i + 3]
+            if kind == b"n":
+                entries[first + k] = (int(offset), int(gen))
+            i += 3
+    dict_end = data.index(b"startxref", end)
+    return entries, data[end + 7:dict_end]
+
+
+def _xref(data: bytes) -> tuple[dict[int, tuple[int, int]], bytes, int]:
+    """Merged xref of the whole /Prev chain (newest wins), newest trailer, startxref."""
+    tail = data[-1024:]
+    pos = tail.rindex(b"startxref")
+    startxref = int(tail[pos + 9:].split()[0])
+    entries, trailer = _trailer(data, startxref)
+    prev = re.search(rb"/Prev\s+(\d+)", trailer)
+    seen = {startxref}
+    while prev:
+        offset = int(prev.group(1))
+        if offset in seen:
+            break
+        seen.add(offset)
+        older, older_trailer = _trailer(data, offset)
+        for num, entry in older.items():
+            entries.setdefault(num, entry)
+        prev = re.search(rb"/Prev\s+(\d+)", older_trailer)
+    return entries, trailer, startxref
+
+
+def _ref(pattern: bytes, text: bytes) -> tuple[int, int] | None:
+    m = re.search(pattern + rb"\s+(\d+)\s+(\d+)\s+R", text)
+    return (int(m.group(1)), int(m.group(2))) if m else None
+
+
+def _read_object(data: bytes, entries, num: int) -> tuple[bytes, bytes | None]:
+    """(dictionary / value bytes, raw stream bytes or None) of object num."""
+    offset = entries[num][0]
+    m = _OBJ_HEADER.match(data, offset)
+    if not m or int(m.group(1)) != num:
+        raise _Unsupported(f"bad xref offset for object {num}")
+    start = m.end()
+    end = data.index(b"endobj", start)
+    stream = _STREAM.search(data, start, end)
+    if stream is None:
+        return data[start:end].strip(), None
+
+    head = data[start:stream.start() + 2].strip()
+    length = re.search(rb"/Length\s+(\d+)(\s+(\d+)\s+R)?", head)
+    if length.group(2):
+        length = int(_read_object(data, entries, int(length.group(1)))[0])
+    else:
+        length = int(length.group(1))
+    return head, data[stream.end():stream.end() + length]
+
+
+def _serialize(num: int, head: bytes, stream: bytes | None) -> bytes:
+    out = b"%d 0 obj\n" % num + head
+    if stream is not None:
+        out += b"\nstream\n" + stream + b"\nendstream"
+    return out + b"\nendobj\n"
+
+
+# ---------------------------------------------------------------------------
+# Incremental append
+# ---------------------------------------------------------------------------
+def _incremental_update(existing: bytes, new_pdf: bytes) -> bytes:
+    """Bytes to append to `existing` so that it also shows all pages of new_pdf."""
+    entries, trailer, startxref = _xref(existing)
+    if b"/Encrypt" in trailer:
+        raise _Unsupported("encrypted")
+    size = int(re.search(rb"/Size\s+(\d+)", trailer).group(1))
+    root = _ref(rb"/Root", trailer)
+    catalog, _ = _read_object(existing, entries, root[0])
+    pages_num, pages_gen = _ref(rb"/Pages", catalog)
+    pages, _ = _read_object(existing, entries, pages_num)
+    kids = re.search(rb"/Kids\s*\[(.*?)\]", pages, re.S)
+    count = re.search(rb"/Count\s+(\d+)", pages)
+    if kids is None or count is None:
+        raise _Unsupported("indirect /Kids")
+
+    new_entries, new_trailer, _ = _xref(new_pdf)
+    new_catalog, _ = _read_object(new_pdf, new_entries, _ref(rb"/Root", new_trailer)[0])
+    new_pages_num = _ref(rb"/Pages", new_catalog)[0]
+    new_pages, _ = _read_object(new_pdf, new_entries, new_pages_num)
+    new_kids = [int(n) for n, _ in _REF.findall(re.search(rb"/Kids\s*\[(.*?)\]", new_pages, re.S).group(1))]
+
+    # everything except the new catalog, page tree root and info dict is copied
+    skip = {_ref(rb"/Root", new_trailer)[0], new_pages_num}
+    info = _ref(rb"/Info", new_trailer)
+    if info:
+        skip.add(info[0])
+    copied = sorted(n for n in new_entries if n not in skip)
+    renumber = {old: size + i for i, old in enumerate(copied)}
+
+    def remap(m):
+        old = int(m.group(1))
+        if old == new_pages_num:
+            return b"%d %d R" % (pages_num, pages_gen)
+        return b"%d 0 R" % renumber.get(old, old)
+
+    base = len(existing) + (0 if existing.endswith(b"\n") else 1)
+    out = bytearray(b"" if existing.endswith(b"\n") else b"\n")
+    offsets = {}
+    for old in copied:
+        head, stream = _read_object(new_pdf, new_entries, old)
+        offsets[renumber[old]] = base + len(out)
+        out += _serialize(renumber[old], _REF.sub(remap, head), stream)
+
+    added = b" ".join(b"%d 0 R" % renumber[k] for k in new_kids)
+    pages = (pages[:kids.start()] + b"/Kids [" + kids.group(1).strip() + b" " + added + b"]"
+             + pages[kids.end():])
+    pages = re.sub(rb"/Count\s+\d+", b"/Count %d" % (int(count.group(1)) + len(new_kids)), pages, count=1)
+    pages_offset = base + len(out)
+    out += b"%d %d obj\n" % (pages_num, pages_gen) + pages + b"\nendobj\n"
+
+    xref_offset = base + len(out)
+    # free-list head first: some readers expect every section to start at object 0
+    out += b"xref\n0 1\n0000000000 65535 f \n"
+    out += b"%d 1\n%010d %05d n \n" % (pages_num, pages_offset, pages_gen)
+    out += b"%d %d\n" % (size, len(copied))
+    for num in range(size, size + len(copied)):
+        out += b"%010d 00000 n \n" % offsets[num]
+    extra = b""
+    old_info = re.search(rb"/Info\s+\d+\s+\d+\s+R", trailer)
+    if old_info:
+        extra += b" " + old_info.group(0)
+    file_id = re.search(rb"/ID\s*\[[^\]]*\]", trailer)
+    if file_id:
+        extra += b" " + file_id.group(0)
+    out += (b"trailer\n<< /Size %d /Root %d %d R /Prev %d%s >>\nstartxref\n%d\n%%%%EOF\n"
+            % (size + len(copied), root[0], root[1], startxref, extra, xref_offset))
+    return bytes(out)
+
+
+def _rewrite(target: str, new_pdf: bytes) -> None:
+    """Fallback: merge with PyPDF2 and rewrite the whole file."""
+    from PyPDF2 import PdfReader, PdfWriter
+    writer = PdfWriter()
+    for p in PdfReader(target).pages:
+        writer.add_page(p)
+    for p in PdfReader(io.BytesIO(new_pdf)).pages:
+        writer.add_page(p)
+    buf = io.BytesIO()
+    writer.write(buf)
+    with open(target, 'wb') as f:
+        f.write(buf.getvalue())
+
+
+def append_pdf(target: str, new_pdf: bytes) -> None:
+    """Append all pages of the in-memory PDF new_pdf to target (created if missing)."""
+    if not os.path.exists(target) or os.path.getsize(target) == 0:
+        with open(target, 'wb') as f:
+            f.write(new_pdf)
+        return
+    with span("pdf_merge"):
+        with open(target, 'rb') as f:
+            existing = f.read()
+        try:
+            update = _incremental_update(existing, new_pdf)
+        except (_Unsupported, ValueError, AttributeError, KeyError, IndexError):
+            _rewrite(target, new_pdf)
+            return
+        with open(target, 'ab') as f:
+            f.write(update)
+
+
+def export_figures(target: str, figures, titles=None, append: bool = True) -> None:
+    """
+    --- Render figures in memory and write them to target in one go ---
+
+            append=True adds the pages to an existing target, append=False
+            replaces it. titles are drawn above each page only for the export.
+    """
+    new_pdf = render_pdf(figures, titles)
+    if append:
+        append_pdf(target, new_pdf)
+    else:
+        with open(target, 'wb') as f:
+            f.write(new_pdf)
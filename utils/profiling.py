@@ -0,0 +1,218 @@
+"""
+Lightweight timing / allocation spans.
+
+    from utils.profiling import span
+    with span("simulate.draw", n=n):
+        ...
+
+Profiling is off by default: span() then returns one shared no-op context
+manager, so an instrumented call costs a global lookup and a function call.
+enable() starts recording; with trace_allocations the peak traced memory
+(tracemalloc) of every span is recorded as well, at a noticeable slowdown.
+trace() / dump() turn the recorded spans into a JSON document with the raw
+spans and per-name totals.
+
+Setting SCALE_SIM_TRACE=<file.json> enables profiling at import and dumps
+the trace to that file when the interpreter exits
+(SCALE_SIM_TRACE_ALLOC=1 adds allocation tracing).
+
+Spans nest per thread: every thread has its own span stack and each record
+carries the thread id. tracemalloc peaks are process wide, so allocation
+peaks of spans that overlap with another thread's work include that work.
+Spans recorded in worker processes are collected with worker_state() /
+start_worker() / take_spans() in the worker and add_spans() in the parent
+(see simulation.parallel).
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+_enabled = False
+_trace_allocations = False
+_spans: list[dict] = []
+# per-thread stack of open spans
+_local = threading.local()
+_started: str | None = None
+_t0 = time.perf_counter()
+
+
+def _stack() -> list:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start", "alloc_start", "child_peak", "stack")
+
+    def __init__(self, name: str, attrs: dict) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.child_peak = 0
+
+    def __enter__(self):
+        self.stack = _stack()
+        if _trace_allocations:
+            self.alloc_start, peak = tracemalloc.get_traced_memory()
+            # the reset below would lose the parent's peak so far: keep it with the parent
+            if self.stack:
+                self.stack[-1].child_peak = max(self.stack[-1].child_peak, peak)
+            tracemalloc.reset_peak()
+        self.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        stack = self.stack
+        stack.pop()
+        record = {
+            "name": self.name,
+            "start_s": self.start - _t0,
+            "duration_s": end - self.start,
+            "depth": len(stack),
+            "thread": threading.get_ident(),
+        }
+        if _trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            # nested spans reset the peak, so their peaks are carried up explicitly
+            peak = max(peak, self.child_peak)
+            record["alloc_peak_b"] = peak - self.alloc_start
+            record["alloc_net_b"] = current - self.alloc_start
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+        if self.attrs:
+            record["attrs"] = self.attrs
+        _spans.append(record)
+        return False
+
+
+def span(name: str, /, **attrs):
+    """Context manager timing the enclosed block as `name` (no-op while disabled)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, attrs)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(trace_allocations: bool = False) -> None:
+    """Start recording spans, dropping anything recorded before."""
+    global _enabled, _trace_allocations, _t0, _started
+    reset()
+    _t0 = time.perf_counter()
+    _started = datetime.now(timezone.utc).isoformat()
+    _trace_allocations = trace_allocations
+    if trace_allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled, _trace_allocations
+    if _trace_allocations and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _enabled = _trace_allocations = False
+
+
+def reset() -> None:
+    global _local
+    _spans.clear()
+    # spans still open keep their old stack and close on it
+    _local = threading.local()
+
+
+def worker_state() -> dict | None:
+    """Settings a worker process needs to record spans (None while disabled)."""
+    if not _enabled:
+        return None
+    return {"trace_allocations": _trace_allocations, "t0": _t0}
+
+
+def start_worker(state: dict | None) -> None:
+    """
+    In a worker process: record spans with the parent's settings and clock
+    origin (perf_counter is system wide on Linux / Windows / macOS), dropping
+    anything inherited through fork. No-op for state None.
+    """
+    global _t0
+    if state is None:
+        return
+    enable(trace_allocations=state["trace_allocations"])
+    _t0 = state["t0"]
+
+
+def take_spans() -> list[dict]:
+    """Recorded spans, removed from this process's trace (send them to the parent)."""
+    pid = os.getpid()
+    spans = [dict(record, pid=pid) for record in _spans]
+    _spans.clear()
+    return spans
+
+
+def add_spans(spans: list[dict], **attrs) -> None:
+    """Merge spans recorded elsewhere (take_spans() of a worker); attrs are added to each."""
+    depth = len(_stack())
+    for record in spans:
+        record = dict(record, depth=record["depth"] + depth)
+        if attrs:
+            record["attrs"] = {**record.get("attrs", {}), **attrs}
+        _spans.append(record)
+
+
+def trace(**meta) -> dict:
+    """
+    --- Recorded spans as a JSON-ready trace ---
+
+            spans are in completion order (children before their parent),
+            totals sums count / time (and the largest allocation peak) per
+            span name. meta is stored as is, e.g. the run name and configs.
+    """
+    totals: dict[str, dict] = {}
+    for s in _spans:
+        t = totals.setdefault(s["name"], {"count": 0, "total_s": 0.0})
+        t["count"] += 1
+        t["total_s"] += s["duration_s"]
+        if "alloc_peak_b" in s:
+            t["alloc_peak_b"] = max(t.get("alloc_peak_b", 0), s["alloc_peak_b"])
+    return {
+        "started": _started,
+        "pid": os.getpid(),
+        "trace_allocations": _trace_allocations,
+        "meta": meta,
+        "totals": totals,
+        "spans": list(_spans),
+    }
+
+
+def dump(path: str, **meta) -> dict:
+    """Write trace(**meta) to path as JSON and return it."""
+    data = trace(**meta)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, default=str)
+    return data
+
+
+if os.environ.get("SCALE_SIM_TRACE"):
+    enable(trace_allocations=os.environ.get("SCALE_SIM_TRACE_ALLOC") == "1")
+    atexit.register(lambda: dump(os.environ["SCALE_SIM_TRACE"]))
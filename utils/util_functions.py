@@ -2,6 +2,31 @@
 import pkgutil
 import importlib
 from dataclasses import is_dataclass
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def gather_configs(pkg):
+    """
+    Scan every sub-module of `pkg` and collect all top-level dataclass instances.
+    Returns a dict of sub-module name -> {preset name: instance}, e.g.:
+      {'cube': {'default': CubeConfig(...), 'heavy': CubeConfig(...), ...},
+       'population': {...},
+       'scale': {...}}
+    The package is only scanned once per process; treat the result as read-only.
+    """
+    configs = {}
+    for _, mod_name, _ in pkgutil.iter_modules(pkg.__path__):
+        module = importlib.import_module(f"{pkg.__name__}.{mod_name}")
+        presets = {
+            name: val
+            for name, val in sorted(vars(module).items())
+            if is_dataclass(val) and not isinstance(val, type)
+        }
+        if presets:
+            configs[mod_name] = presets
+    return configs
+
 
 def gather_config_names(pkg):
     """
@@ -11,14 +36,9 @@ def gather_config_names(pkg):
        ['default','small','medium','large'],
        ['cube_scale','abc_scale','aec_scale']]
     """
-    all_name_lists = []
-    for _, mod_name, _ in pkgutil.iter_modules(pkg.__path__):
-        module = importlib.import_module(f"{pkg.__name__}.{mod_name}")
-        names = sorted(
-            name
-            for name, val in vars(module).items()
-            if is_dataclass(val) and not isinstance(val, type)
-        )
-        if names:
-            all_name_lists.append(names)
-    return all_name_lists
+    return [list(presets) for presets in gather_configs(pkg).values()]
+
+
+def safe_filename(name: str) -> str:
+    """Replace characters that are awkward in file names (':', '=', ',' ...) with '_'."""
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
@@ -0,0 +1,43 @@
+import copy
+import queue
+import threading
+
+from simulation.population import Population
+
+
+class SimulationWorker(threading.Thread):
+    """
+    --- Runs Population.simulate_stream() off the GUI thread ---
+
+            Never touches Tk: results go into `messages` and the GUI polls the
+            queue from its own event loop (Tk is not thread safe). Messages:
+              ("progress", done, hists)  after every chunk, hists is a copy
+              ("done", pop)              finished
+              ("cancelled", pop)         stopped by cancel(), partial stats
+              ("error", exc)             simulation raised
+    """
+    def __init__(self, pop: Population, chunk_size: int = 500_000) -> None:
+        super().__init__(daemon=True)
+        self.pop = pop
+        self.chunk_size = chunk_size
+        self.messages: queue.Queue = queue.Queue()
+        self._stop_event = threading.Event()
+
+    def cancel(self) -> None:
+        self._stop_event.set()
+
+    def _progress(self, done, hists) -> None:
+        # copy: the worker keeps adding to the live histograms
+        self.messages.put(("progress", done, copy.deepcopy(hists)))
+
+    def run(self) -> None:
+        try:
+            self.pop.simulate_stream(
+                chunk_size=self.chunk_size,
+                progress=self._progress,
+                should_stop=self._stop_event.is_set,
+            )
+        except Exception as exc:
+            self.messages.put(("error", exc))
+            return
+        self.messages.put(("cancelled" if self._stop_event.is_set() else "done", self.pop))